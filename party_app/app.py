@@ -1,17 +1,26 @@
 from flask import Flask, session, render_template, request, redirect
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, join_room, emit
 import os
 from dotenv import load_dotenv
 import logging
-from datetime import datetime, timedelta, timezone
+import atexit
+import click
 
 load_dotenv()
 
 from services.user_service import UserService
 from services.music_service import MusicService
 from services.search_service import SearchService
+from services.stream_service import StreamService
+from services.prefetch_service import PrefetchService
+from services.playback_service import PlaybackService
+from services.playback_events import PlaybackEventEncoder, user_room
+from services.token_renewal_service import TokenRenewalService
 from pubnub_app.pubnub_client import PubNubClient
+from pubnub_app.status_pipeline import StatusPipeline
 from decorators.token_required import token_required
+from mongodb_client import create_indexes, migrate_favorites_arrays, backfill_playlist_fields
+from pagination import DEFAULT_PAGE_SIZE, encode_cursor
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,10 +33,18 @@ app.config.update(
     SESSION_COOKIE_SAMESITE='Lax',
 )
 
-socketio = SocketIO(app)
+socketio = SocketIO(app, message_queue=os.getenv("SOCKETIO_MESSAGE_QUEUE"))
 
-last_playback_states = {}
-last_update_times = {}
+playback_events = PlaybackEventEncoder()
+
+def prepare_database():
+    # Run once per start-up by `python app.py` or `flask prepare-db`, not on import; each step is idempotent.
+    create_indexes()
+    try:
+        migrate_favorites_arrays()
+        backfill_playlist_fields()
+    except Exception as e:
+        logger.error(f"Error migrating database: {e}")
 
 def handle_status_update(message):
     try:
@@ -38,55 +55,65 @@ def handle_status_update(message):
             return
         logger.info(f"[handle_status_update] got message: {message}")
 
-        now = datetime.now(timezone.utc)
-        last_state = last_playback_states.get(user_id)
-        last_update = last_update_times.get(user_id, now - timedelta(seconds=10))
-
-        existing_db = app.user_service.get_current_playback(user_id)
-        if existing_db and "current_song" in existing_db:
-            db_song = existing_db["current_song"]
-            db_pos = db_song.get("position", 0)
+        existing = app.user_service.get_current_playback(str(user_id))
+        if existing and "current_song" in existing:
+            known_song = existing["current_song"]
+            known_pos = known_song.get("position", 0)
             msg_pos = current_song.get("position", 0)
-            if msg_pos < db_pos:
-                logger.info(f"[handle_status_update] ignoring older position msg_pos={msg_pos} < db_pos={db_pos}")
+            if msg_pos < known_pos and known_song.get("video_id") == current_song.get("video_id"):
+                logger.info(f"[handle_status_update] ignoring older position msg_pos={msg_pos} < known_pos={known_pos}")
                 return
+            current_song = dict(known_song, **current_song)
+
+        app.user_service.record_status_playback(str(user_id), current_song)
+        app.playback_service.confirm_track_change(str(user_id), current_song)
 
-        if last_state != current_song:
-            state_changed = False
-            if last_state is None:
-                state_changed = True
-            else:
-                for key in ["video_id", "title", "state", "position", "mode", "motion_detected"]:
-                    if last_state.get(key) != current_song.get(key):
-                        state_changed = True
-                        break
-
-            if state_changed and (now - last_update) >= timedelta(seconds=1):
-                last_playback_states[user_id] = current_song
-                last_update_times[user_id] = now
-
-                app.user_service.update_current_playback(str(user_id), current_song)
-                logger.info(f"Updated current_playback for user {user_id}.")
-
-                socketio.emit('playback_update', {'user_id': user_id, 'current_song': current_song})
-                logger.info(f"Emitted playback_update for user {user_id}.")
-            else:
-                logger.debug(f"Update for user {user_id} skipped due to frequency limit.")
+        payload = playback_events.delta(user_id, current_song)
+        if payload:
+            socketio.emit('playback_update', payload, to=user_room(user_id))
+            logger.info(f"Emitted {payload['type']} playback_update for user {user_id}.")
         else:
-            logger.debug(f"No significant change in playback state for user {user_id}. Skipping emission.")
+            logger.debug(f"Position for user {user_id} matches the interpolated clock. Skipping emission.")
     except Exception as e:
         logger.error(f"Error handling status update: {e}")
 
-pubnub_client = PubNubClient(handle_status_update)
+status_pipeline = StatusPipeline(handle_status_update)
+status_pipeline.start()
+app.status_pipeline = status_pipeline
+
+pubnub_client = PubNubClient(status_pipeline.submit)
 app.pubnub_client = pubnub_client
 
 user_service = UserService(pubnub_client)
+user_service.playback_state.start()
+user_service.history_writer.start()
+atexit.register(user_service.history_writer.stop)
+atexit.register(user_service.playback_state.stop)
+atexit.register(status_pipeline.stop)
 app.user_service = user_service
 
+token_renewal_service = TokenRenewalService(user_service, pubnub_client)
+token_renewal_service.start()
+app.token_renewal_service = token_renewal_service
+
 music_service = MusicService()
 app.music_service = music_service
 
 search_service = SearchService()
+app.search_service = search_service
+
+stream_service = StreamService()
+stream_service.start()
+app.stream_service = stream_service
+
+prefetch_service = PrefetchService(user_service, stream_service, pubnub_client)
+app.prefetch_service = prefetch_service
+
+playback_service = PlaybackService(
+    user_service, stream_service, prefetch_service, search_service,
+    pubnub_client, socketio, playback_events
+)
+app.playback_service = playback_service
 
 from blueprints.auth import auth_bp
 from blueprints.music import music_bp
@@ -96,6 +123,8 @@ from blueprints.favorites import favorites_bp
 from blueprints.categories import categories_bp
 from blueprints.playback import playback_bp
 from blueprints.preferences import preferences_bp
+from blueprints.metrics import metrics_bp
+from blueprints.stats import stats_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(music_bp)
@@ -105,6 +134,25 @@ app.register_blueprint(favorites_bp)
 app.register_blueprint(categories_bp)
 app.register_blueprint(playback_bp)
 app.register_blueprint(preferences_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(stats_bp)
+
+@app.cli.command("prepare-db", help="Create indexes and run the idempotent data migrations.")
+def prepare_db_command():
+    prepare_database()
+
+@app.cli.command("rebuild-stats", help="Raise track stats to the play counts found in the retained playback history.")
+@click.argument("google_id", required=False)
+def rebuild_stats_command(google_id):
+    from mongodb_client import rebuild_track_stats
+    count = rebuild_track_stats(google_id)
+    logger.info(f"Rebuilt listening stats: {count} tracks{f' for user {google_id}' if google_id else ''}.")
+
+@app.cli.command("migrate-history", help="Move the legacy playback_history rows into daily buckets and count them in track stats.")
+def migrate_history_command():
+    from mongodb_client import migrate_legacy_playback_history
+    count = migrate_legacy_playback_history()
+    logger.info(f"Migrated {count} legacy playback history rows.")
 
 @app.route("/", methods=["GET", "POST"])
 @token_required
@@ -134,15 +182,19 @@ def dashboard(current_user):
     preferences = user_service.get_preferences(google_id) or {
         "volume": 0.5, "led_mode": "default", "motion_detection": True
     }
-    favorites_doc = user_service.get_favorites(google_id)
-    favorites_list = favorites_doc.get("songs", []) if favorites_doc else []
+    favorites_list = user_service.get_favorites_page(google_id, DEFAULT_PAGE_SIZE + 1)
+    favorites_cursor = None
+    if len(favorites_list) > DEFAULT_PAGE_SIZE:
+        favorites_list = favorites_list[:DEFAULT_PAGE_SIZE]
+        favorites_cursor = encode_cursor(favorites_list[-1]["added_at"], favorites_list[-1]["_id"])
 
     return render_template(
         "dashboard.html",
         user=current_user.get("name"),
         preferences=preferences,
         allowed_modes=["default", "party", "chill"],
-        favorites=favorites_list
+        favorites=favorites_list,
+        favorites_cursor=favorites_cursor
     )
 
 @app.route("/logout")
@@ -156,16 +208,23 @@ def unauthorized():
 
 @socketio.on('connect')
 def handle_connect():
-    logger.info("Client connected via WebSocket.")
+    google_id = session.get("google_id")
+    if not google_id:
+        logger.warning("Rejected unauthenticated WebSocket connection.")
+        return False
+    join_room(user_room(google_id))
+    logger.info(f"Client connected via WebSocket and joined room for user {google_id}.")
+
+    current_playback = user_service.get_current_playback(google_id)
+    if current_playback and current_playback.get("current_song"):
+        emit('playback_update', playback_events.build_snapshot(google_id, current_playback["current_song"]))
 
 @socketio.on('disconnect')
 def handle_disconnect():
     logger.info("Client disconnected from WebSocket.")
 
 if __name__ == "__main__":
-    from mongodb_client import create_indexes
-    create_indexes()
-
+    prepare_database()
     with app.app_context():
         users = app.user_service.get_all_users()
         user_ids = [user["google_id"] for user in users]
@@ -0,0 +1,86 @@
+import bisect
+import html
+import threading
+from collections import OrderedDict
+
+MAX_KEY_TOKENS = 6
+
+def normalize_text(text):
+    return " ".join(html.unescape(text).lower().split())
+
+class AutocompleteIndex:
+    def __init__(self, max_titles=5000):
+        self.max_titles = max_titles
+        self._lock = threading.Lock()
+        self._keys = []
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _index_keys(self, title):
+        tokens = normalize_text(title).split()
+        return {" ".join(tokens[i:]) for i in range(min(len(tokens), MAX_KEY_TOKENS))}
+
+    def add(self, title, video_id, weight=1):
+        if not title or not video_id:
+            return
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry:
+                entry["weight"] += weight
+                self._entries.move_to_end(video_id)
+                return
+
+            keys = self._index_keys(title)
+            self._entries[video_id] = {"title": html.unescape(title), "weight": weight, "keys": keys}
+            for key in keys:
+                bisect.insort(self._keys, (key, video_id))
+
+            while len(self._entries) > self.max_titles:
+                old_id, old_entry = self._entries.popitem(last=False)
+                for key in old_entry["keys"]:
+                    i = bisect.bisect_left(self._keys, (key, old_id))
+                    if i < len(self._keys) and self._keys[i] == (key, old_id):
+                        del self._keys[i]
+
+    def search(self, prefix, max_results=3):
+        prefix = normalize_text(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            matches = {}
+            i = bisect.bisect_left(self._keys, (prefix, ""))
+            while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+                video_id = self._keys[i][1]
+                matches[video_id] = self._entries[video_id]
+                i += 1
+
+            if matches:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            ranked = sorted(matches.items(), key=lambda item: item[1]["weight"], reverse=True)
+            suggestions = []
+            seen_titles = set()
+            for video_id, entry in ranked:
+                if entry["title"] in seen_titles:
+                    continue
+                seen_titles.add(entry["title"])
+                suggestions.append({"title": entry["title"], "video_id": video_id})
+                if len(suggestions) >= max_results:
+                    break
+            return suggestions
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "titles": len(self._entries),
+                "keys": len(self._keys),
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -71,7 +71,6 @@ def authorized():
                 "channel_token_status": token_status,
                 "channel_token_status_expiration": expiration_status,
                 "playlists": [],
-                "favorites": None,
                 "preferences": {
                     "volume": 0.5,
                     "led_mode": "default",
@@ -82,14 +81,9 @@ def authorized():
             user_service.save_user(user_doc)
             logger.info(f"New user {google_id} saved.")
 
-            favorites_id = user_service.create_favorites(google_id)
-            user_service.update_user_tokens(google_id, {"favorites": favorites_id})
-            logger.info(f"Favorites created for user {google_id} with ID {favorites_id}.")
-
-        else:
-            tokens_updated = user_service.update_tokens_if_expired(google_id, user_doc)
-            if tokens_updated:
-                logger.info(f"Tokens updated for user {google_id}.")
+        elif user_service.has_expired_tokens(user_doc):
+            current_app.token_renewal_service.request_renewal(user_doc)
+            logger.info(f"Token renewal scheduled for user {google_id}.")
 
         logger.info(f"User {google_id} authenticated successfully.")
         return redirect("/")
@@ -1,11 +1,13 @@
 from flask import Blueprint, jsonify, request, current_app
 from services.user_service import UserService
+from services.search_service import SearchService, WEIGHT_FAVORITE
 from decorators.token_required import token_required
 from marshmallow import Schema, fields, ValidationError
 import logging
 from datetime import datetime, timezone
 
 from youtube_api import get_video_details
+from pagination import encode_cursor, decode_cursor, parse_limit
 
 favorites_bp = Blueprint('favorites', __name__)
 logger = logging.getLogger(__name__)
@@ -52,8 +54,10 @@ def add_favorite_song(current_user):
         "added_at": now
     }
 
-    user_service.add_favorite(user_id, song_obj)
-    logger.info(f"Added song {video_id} to favorites for user {user_id}.")
+    if not user_service.add_favorite(user_id, song_obj):
+        return jsonify({"message": "Song is already in favorites."}), 200
+    search_service: SearchService = current_app.search_service
+    search_service.record_title(real_title, video_id, WEIGHT_FAVORITE, google_id=user_id)
     return jsonify({"message": "Song added to favorites."}), 201
 
 @favorites_bp.route("/api/favorites/<video_id>", methods=["DELETE"])
@@ -61,18 +65,33 @@ def add_favorite_song(current_user):
 def remove_favorite_song(current_user, video_id):
     user_id = str(current_user["google_id"])
     user_service: UserService = current_app.user_service
-    user_service.remove_favorite(user_id, video_id)
-    logger.info(f"Removed song {video_id} from favorites for user {user_id}.")
+    if not user_service.remove_favorite(user_id, video_id):
+        return jsonify({"error": "Song is not in favorites."}), 404
     return jsonify({"message": "Song removed from favorites."}), 200
 
+@favorites_bp.route("/api/favorites/<video_id>", methods=["GET"])
+@token_required
+def check_favorite_song(current_user, video_id):
+    user_id = str(current_user["google_id"])
+    user_service: UserService = current_app.user_service
+    return jsonify({"video_id": video_id, "favorite": user_service.is_favorite(user_id, video_id)}), 200
+
 @favorites_bp.route("/api/favorites", methods=["GET"])
 @token_required
 def get_user_favorites(current_user):
     user_id = str(current_user["google_id"])
     user_service: UserService = current_app.user_service
-    favorites = user_service.get_favorites(user_id)
-    if favorites:
-        favorites_list = favorites.get("songs", [])
-        return jsonify({"favorites": favorites_list}), 200
-    else:
-        return jsonify({"favorites": []}), 200
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        after = decode_cursor(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    songs = user_service.get_favorites_page(user_id, limit + 1, after)
+    next_cursor = None
+    if len(songs) > limit:
+        songs = songs[:limit]
+        next_cursor = encode_cursor(songs[-1]["added_at"], songs[-1]["_id"])
+    for song in songs:
+        song.pop("_id", None)
+    return jsonify({"favorites": songs, "next_cursor": next_cursor}), 200
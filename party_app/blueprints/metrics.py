@@ -0,0 +1,26 @@
+from flask import Blueprint, jsonify, current_app
+from decorators.token_required import token_required
+import logging
+
+from youtube_api import get_video_cache_stats, youtube_http
+
+metrics_bp = Blueprint('metrics', __name__)
+logger = logging.getLogger(__name__)
+
+@metrics_bp.route("/api/metrics", methods=["GET"])
+@token_required
+def get_metrics(current_user):
+    return jsonify({
+        "video_details_cache": get_video_cache_stats(),
+        "youtube_http": youtube_http.stats(),
+        "user_cache": current_app.user_service.stats(),
+        "status_pipeline": current_app.status_pipeline.stats(),
+        "playback_state": current_app.user_service.playback_state.stats(),
+        "playback_history": current_app.user_service.history_writer.stats(),
+        "token_renewal": current_app.token_renewal_service.stats(),
+        "search_cache": current_app.search_service.stats(),
+        "stream_url_cache": current_app.stream_service.stats(),
+        "prefetch": current_app.prefetch_service.stats(),
+        "playback_jobs": current_app.playback_service.stats(),
+        "playback_events": current_app.playback_service.playback_events.stats()
+    }), 200
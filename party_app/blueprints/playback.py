@@ -1,13 +1,12 @@
 from flask import Blueprint, jsonify, request, current_app
 from services.user_service import UserService
+from services.playback_service import PlaybackService, ASYNC_ACTIONS
 from decorators.token_required import token_required
 from marshmallow import Schema, fields, ValidationError
 import logging
 import traceback
 from datetime import datetime, timezone
 
-from youtube_api import get_video_details, get_direct_stream_url
-
 logger = logging.getLogger(__name__)
 
 class PlayCommandSchema(Schema):
@@ -26,6 +25,7 @@ class PlayCommandSchema(Schema):
     timestamp = fields.Integer(required=False)
     mode = fields.String(required=False, validate=lambda x: x in ["repeat", "default", "shuffle"])
     enabled = fields.Boolean(required=False)
+    source = fields.String(required=False, validate=lambda x: x in ["search", "favorites"])
 
 play_command_schema = PlayCommandSchema()
 playback_bp = Blueprint('playback', __name__)
@@ -39,163 +39,21 @@ def handle_playback(current_user):
         action = validated_data.get("action")
 
         user_service: UserService = current_app.user_service
-        pubnub_client = current_app.pubnub_client
+        playback_service: PlaybackService = current_app.playback_service
         google_id = current_user["google_id"]
-
-        video_id = validated_data.get("video_id")
-        fallback_title = validated_data.get("title", "Unknown Title")
-        fallback_thumb = validated_data.get("thumbnail_url", "")
-        fallback_duration = validated_data.get("duration", 0)
         position = validated_data.get("position", 0.0)
-        timestamp = validated_data.get("timestamp", 0)
-        mode = validated_data.get("mode", "default")
-
-        if action == "play":
-            if not video_id:
-                return jsonify({"error": "video_id is required for play action"}), 400
-
-            current_playback = user_service.get_current_playback(google_id)
-            if current_playback and "current_song" in current_playback:
-                current_song = current_playback["current_song"]
-                if (current_song["video_id"] == video_id and current_song["state"] in ["playing", "pause"]):
-                    current_song["state"] = "playing"
-                    current_song["position"] = position
-                    current_song["updated_at"] = datetime.now(timezone.utc)
-                    stream_url = current_song.get("stream_url")
-                    if not stream_url:
-                        stream_url = get_direct_stream_url(video_id)
-                        current_song["stream_url"] = stream_url
-                    user_service.update_current_playback(google_id, current_song)
-
-                    command = {
-                        "action": "play_direct",
-                        "stream_url": stream_url,
-                        "title": current_song["title"],
-                        "thumbnail_url": current_song["thumbnail_url"],
-                        "duration": current_song["duration"],
-                        "position": position,
-                        "timestamp": timestamp,
-                        "mode": mode
-                    }
-                    pubnub_client.publish_message(current_user["channel_name_commands"], command)
-                    logger.info(f"Updated position for same video {video_id} at position {position}.")
-                    return jsonify({"message": "Play command for same video updated."}), 200
-
-            details = get_video_details(video_id)
-            if details:
-                actual_title = details["title"] or fallback_title
-                actual_thumb = details["thumbnail_url"] or fallback_thumb
-                actual_duration = details["duration_seconds"] or fallback_duration
-            else:
-                actual_title = fallback_title
-                actual_thumb = fallback_thumb
-                actual_duration = fallback_duration
-
-            direct_url = get_direct_stream_url(video_id)
-
-            current_song = {
-                "video_id": video_id,
-                "title": actual_title,
-                "thumbnail_url": actual_thumb,
-                "duration": actual_duration,
-                "position": position,
-                "state": "playing",
-                "mode": mode,
-                "motion_detected": current_user.get("preferences", {}).get("motion_detection", True),
-                "updated_at": datetime.now(timezone.utc),
-                "stream_url": direct_url
-            }
-            user_service.update_current_playback(google_id, current_song)
-            user_service.log_playback_history(google_id, video_id, actual_title)
-
-            command = {
-                "action": "play_direct",
-                "stream_url": direct_url,
-                "title": actual_title,
-                "thumbnail_url": actual_thumb,
-                "duration": actual_duration,
-                "position": position,
-                "timestamp": timestamp,
-                "mode": mode
-            }
-            pubnub_client.publish_message(current_user["channel_name_commands"], command)
-            logger.info(f"Published play command: {command}")
-            return jsonify({"message": "Play command (direct URL) sent."}), 200
-
-        elif action == "pause":
-            logger.info(f"[handle_playback] 'pause' action received. position={position}, user={google_id}")
-            curr = user_service.get_current_playback(google_id)
-            if curr and "current_song" in curr:
-                song = curr["current_song"]
-                song["state"] = "pause"
-                song["position"] = position
-                song["updated_at"] = datetime.now(timezone.utc)
-                user_service.update_current_playback(google_id, song)
-
-            pubnub_client.publish_message(current_user["channel_name_commands"], {
-                "action": "pause",
-                "position": position,
-                "timestamp": timestamp
-            })
-            return jsonify({"message": "Pause command sent."}), 200
-
-        elif action in ["next", "previous"]:
-            logger.info(f"[handle_playback] '{action}' action for user={google_id}")
-            pubnub_client.publish_message(current_user["channel_name_commands"], {
-                "action": action
-            })
-            return jsonify({"message": f"{action.capitalize()} command sent."}), 200
-
-        elif action == "seek":
-            logger.info(f"[handle_playback] 'seek' action. position={position}, user={google_id}")
-            curr = user_service.get_current_playback(google_id)
-            if curr and "current_song" in curr:
-                song = curr["current_song"]
-                song["position"] = position
-                song["updated_at"] = datetime.now(timezone.utc)
-                user_service.update_current_playback(google_id, song)
-
-            pubnub_client.publish_message(current_user["channel_name_commands"], {
-                "action": "seek",
-                "position": position,
-                "timestamp": timestamp
-            })
-            return jsonify({"message": "Seek command sent."}), 200
-
-        elif action == "set_mode":
-            logger.info(f"[handle_playback] 'set_mode'={mode}, user={google_id}")
-            curr = user_service.get_current_playback(google_id)
-            if curr and "current_song" in curr:
-                song = curr["current_song"]
-                song["mode"] = mode
-                song["updated_at"] = datetime.now(timezone.utc)
-                user_service.update_current_playback(google_id, song)
-
-            pubnub_client.publish_message(current_user["channel_name_commands"], {
-                "action": "set_mode",
-                "mode": mode
-            })
-            return jsonify({"message": f"Set mode to {mode}."}), 200
-
-        elif action == "set_motion_detection":
-            enabled = validated_data.get("enabled", True)
-            logger.info(f"[handle_playback] set_motion_detection={enabled}, user={google_id}")
-            prefs = current_user.get("preferences", {})
-            prefs["motion_detection"] = enabled
-            user_service.save_preferences(google_id, prefs)
 
-            curr = user_service.get_current_playback(google_id)
-            if curr and "current_song" in curr:
-                song = curr["current_song"]
-                song["motion_detected"] = enabled
-                song["updated_at"] = datetime.now(timezone.utc)
-                user_service.update_current_playback(google_id, song)
-
-            pubnub_client.publish_message(current_user["channel_name_commands"], {
-                "action": "set_motion_detection",
-                "enabled": enabled
-            })
-            return jsonify({"message": f"Motion detection => {enabled}"}), 200
+        if action == "play" and not validated_data.get("video_id"):
+            return jsonify({"error": "video_id is required for play action"}), 400
+
+        if action in ASYNC_ACTIONS:
+            job = playback_service.submit(current_user, validated_data)
+            logger.info(f"[handle_playback] Queued '{action}' job {job['job_id']} for user={google_id}")
+            return jsonify({
+                "message": f"{action.capitalize()} command accepted.",
+                "job_id": job["job_id"],
+                "status": job["status"]
+            }), 202
 
         elif action == "update_position":
             logger.info(f"[handle_playback] 'update_position' for user={google_id}, position={position}")
@@ -227,6 +85,21 @@ def handle_playback(current_user):
         logger.error(traceback.format_exc())
         return jsonify({'error': 'Internal server error'}), 500
 
+@playback_bp.route("/api/playback/jobs/<job_id>", methods=["GET"])
+@token_required
+def get_playback_job(current_user, job_id):
+    playback_service: PlaybackService = current_app.playback_service
+    job = playback_service.get_job(job_id)
+    if not job or job["user_id"] != current_user["google_id"]:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify({
+        "job_id": job["job_id"],
+        "action": job["action"],
+        "status": job["status"],
+        "message": job["message"],
+        "error": job["error"]
+    }), 200
+
 @playback_bp.route("/api/current_playback", methods=["GET"])
 @token_required
 def get_current_playback_route(current_user):
@@ -4,6 +4,9 @@ from decorators.token_required import token_required
 from bson.objectid import ObjectId
 from marshmallow import Schema, fields, ValidationError
 import logging
+from datetime import datetime, timezone
+
+from pagination import encode_cursor, decode_cursor, parse_limit
 
 playlists_bp = Blueprint('playlists', __name__)
 logger = logging.getLogger(__name__)
@@ -15,9 +18,38 @@ class PlaylistUpdateSchema(Schema):
     name = fields.String(required=False)
     description = fields.String(required=False)
     songs = fields.List(fields.Dict(), required=False)
+    expected_version = fields.Integer(required=False)
+
+class PlaylistSongSchema(Schema):
+    video_id = fields.String(required=True)
+    title = fields.String(required=False)
+    thumbnail_url = fields.String(required=False)
+    duration = fields.Integer(required=False)
+
+class PlaylistSongsInsertSchema(Schema):
+    songs = fields.List(fields.Nested(PlaylistSongSchema), required=True, validate=lambda x: len(x) > 0)
+    position = fields.Integer(required=False, validate=lambda x: x >= 0)
+    expected_version = fields.Integer(required=False)
+
+class PlaylistSongMoveSchema(Schema):
+    position = fields.Integer(required=True, validate=lambda x: x >= 0)
+    expected_version = fields.Integer(required=False)
 
 playlist_create_schema = PlaylistCreateSchema()
 playlist_update_schema = PlaylistUpdateSchema()
+playlist_songs_insert_schema = PlaylistSongsInsertSchema()
+playlist_song_move_schema = PlaylistSongMoveSchema()
+
+def _playlist_write_failed(user_service, user_id, playlist_id, expected_version, message, status=409):
+    current = user_service.get_playlist_version(user_id, playlist_id)
+    if not current:
+        return jsonify({"error": "Playlist not found."}), 404
+    if expected_version is not None and current.get("version") != expected_version:
+        return jsonify({"error": "Playlist was modified by someone else.", "version": current.get("version")}), 409
+    return jsonify({"error": message, "version": current.get("version")}), status
+
+def _playlist_write_ok(message, result):
+    return jsonify({"message": message, "version": result["version"], "song_count": result.get("song_count", 0)}), 200
 
 @playlists_bp.route("/api/playlists", methods=["POST"])
 @token_required
@@ -41,6 +73,8 @@ def create_new_playlist(current_user):
 @playlists_bp.route("/api/playlists/<playlist_id>", methods=["PUT"])
 @token_required
 def update_existing_playlist(current_user, playlist_id):
+    if not ObjectId.is_valid(playlist_id):
+        return jsonify({"error": "Invalid playlist ID."}), 400
     data = request.get_json()
     try:
         validated_data = playlist_update_schema.load(data)
@@ -50,45 +84,163 @@ def update_existing_playlist(current_user, playlist_id):
     user_id = str(current_user["_id"])
     user_service: UserService = current_app.user_service
 
-    playlist = user_service.get_playlists(user_id).filter({"_id": ObjectId(playlist_id)}).first()
-    if not playlist:
-        return jsonify({"error": "Playlist not found."}), 404
-
     update_data = {}
     if "name" in validated_data:
         update_data["name"] = validated_data["name"]
     if "description" in validated_data:
         update_data["description"] = validated_data["description"]
     if "songs" in validated_data:
-        update_data["songs"] = validated_data["songs"]
+        unique_songs = {}
+        for song in validated_data["songs"]:
+            if song.get("video_id"):
+                unique_songs.setdefault(song["video_id"], song)
+        update_data["songs"] = list(unique_songs.values())
 
     if not update_data:
         return jsonify({"error": "No valid fields to update."}), 400
 
-    user_service.update_playlist(ObjectId(playlist_id), update_data)
-    logger.info(f"Updated playlist {playlist_id} for user {user_id}.")
+    expected_version = validated_data.get("expected_version")
+    result = user_service.update_playlist(user_id, ObjectId(playlist_id), update_data, expected_version)
+    if not result:
+        return _playlist_write_failed(user_service, user_id, ObjectId(playlist_id), expected_version,
+                                      "Playlist could not be updated.")
 
-    return jsonify({"message": "Playlist updated successfully."}), 200
+    return _playlist_write_ok("Playlist updated successfully.", result)
+
+@playlists_bp.route("/api/playlists/<playlist_id>/songs", methods=["POST"])
+@token_required
+def add_playlist_songs(current_user, playlist_id):
+    if not ObjectId.is_valid(playlist_id):
+        return jsonify({"error": "Invalid playlist ID."}), 400
+    try:
+        validated_data = playlist_songs_insert_schema.load(request.get_json() or {})
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    songs = validated_data["songs"]
+    if len({song["video_id"] for song in songs}) != len(songs):
+        return jsonify({"error": "Duplicate songs in request."}), 400
+
+    now = datetime.now(timezone.utc)
+    for song in songs:
+        song["added_at"] = now
+
+    user_id = str(current_user["_id"])
+    user_service: UserService = current_app.user_service
+    expected_version = validated_data.get("expected_version")
+    result = user_service.insert_playlist_songs(
+        user_id, ObjectId(playlist_id), songs, validated_data.get("position"), expected_version
+    )
+    if not result:
+        return _playlist_write_failed(user_service, user_id, ObjectId(playlist_id), expected_version,
+                                      "Song is already in the playlist.")
+
+    logger.info(f"Added {len(songs)} songs to playlist {playlist_id} for user {user_id}.")
+    return _playlist_write_ok("Songs added to playlist.", result)
+
+@playlists_bp.route("/api/playlists/<playlist_id>/songs/<video_id>", methods=["DELETE"])
+@token_required
+def remove_song_from_playlist(current_user, playlist_id, video_id):
+    if not ObjectId.is_valid(playlist_id):
+        return jsonify({"error": "Invalid playlist ID."}), 400
+    try:
+        expected_version = request.args.get("expected_version", type=int)
+    except ValueError:
+        return jsonify({"error": "Invalid expected_version."}), 400
+
+    user_id = str(current_user["_id"])
+    user_service: UserService = current_app.user_service
+    result = user_service.remove_playlist_song(user_id, ObjectId(playlist_id), video_id, expected_version)
+    if not result:
+        return _playlist_write_failed(user_service, user_id, ObjectId(playlist_id), expected_version,
+                                      "Song is not in the playlist.", 404)
+
+    logger.info(f"Removed song {video_id} from playlist {playlist_id} for user {user_id}.")
+    return _playlist_write_ok("Song removed from playlist.", result)
+
+@playlists_bp.route("/api/playlists/<playlist_id>/songs/<video_id>/move", methods=["POST"])
+@token_required
+def move_song_in_playlist(current_user, playlist_id, video_id):
+    if not ObjectId.is_valid(playlist_id):
+        return jsonify({"error": "Invalid playlist ID."}), 400
+    try:
+        validated_data = playlist_song_move_schema.load(request.get_json() or {})
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    user_id = str(current_user["_id"])
+    user_service: UserService = current_app.user_service
+    expected_version = validated_data.get("expected_version")
+    result = user_service.move_playlist_song(
+        user_id, ObjectId(playlist_id), video_id, validated_data["position"], expected_version
+    )
+    if not result:
+        return _playlist_write_failed(user_service, user_id, ObjectId(playlist_id), expected_version,
+                                      "Song is not in the playlist.", 404)
+
+    logger.info(f"Moved song {video_id} to position {validated_data['position']} in playlist {playlist_id}.")
+    return _playlist_write_ok("Song moved.", result)
 
 @playlists_bp.route("/api/playlists", methods=["GET"])
 @token_required
 def get_user_playlists(current_user):
     user_id = str(current_user["_id"])
     user_service: UserService = current_app.user_service
-    playlists = user_service.get_playlists(user_id)
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        after = decode_cursor(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    playlists = user_service.get_playlist_summaries(user_id, limit + 1, after)
+    next_cursor = None
+    if len(playlists) > limit:
+        playlists = playlists[:limit]
+        next_cursor = encode_cursor(playlists[-1]["updated_at"], playlists[-1]["_id"])
+
     playlists_list = []
     for pl in playlists:
         pl_dict = {
             "playlist_id": str(pl["_id"]),
             "name": pl["name"],
             "description": pl.get("description", ""),
-            "songs": pl.get("songs", []),
+            "song_count": pl.get("song_count", 0),
+            "version": pl.get("version", 0),
             "created_at": pl["created_at"].isoformat(),
             "updated_at": pl["updated_at"].isoformat()
         }
         playlists_list.append(pl_dict)
 
-    return jsonify({"playlists": playlists_list}), 200
+    return jsonify({"playlists": playlists_list, "next_cursor": next_cursor}), 200
+
+@playlists_bp.route("/api/playlists/<playlist_id>/songs", methods=["GET"])
+@token_required
+def get_playlist_songs(current_user, playlist_id):
+    if not ObjectId.is_valid(playlist_id):
+        return jsonify({"error": "Invalid playlist ID."}), 400
+    try:
+        limit = parse_limit(request.args.get("limit"))
+        offset = max(int(request.args.get("offset", 0)), 0)
+    except ValueError:
+        return jsonify({"error": "Invalid offset or limit."}), 400
+
+    user_id = str(current_user["_id"])
+    user_service: UserService = current_app.user_service
+    playlist = user_service.get_playlist_songs(user_id, ObjectId(playlist_id), offset, limit)
+    if not playlist:
+        return jsonify({"error": "Playlist not found."}), 404
+
+    songs = playlist.get("songs", [])
+    song_count = playlist.get("song_count", 0)
+    next_offset = offset + len(songs) if offset + len(songs) < song_count else None
+    return jsonify({
+        "playlist_id": playlist_id,
+        "songs": songs,
+        "song_count": song_count,
+        "version": playlist.get("version", 0),
+        "offset": offset,
+        "next_offset": next_offset
+    }), 200
 
 @playlists_bp.route("/api/playlists/<playlist_id>", methods=["DELETE"])
 @token_required
@@ -1,9 +1,9 @@
-from flask import Blueprint, jsonify, request, redirect, session
+from flask import Blueprint, jsonify, request, redirect, session, current_app
 from services.search_service import SearchService
+from services.user_service import UserService
 import logging
 
 search_bp = Blueprint('search', __name__)
-search_service = SearchService()
 logger = logging.getLogger(__name__)
 
 @search_bp.route("/search", methods=["GET"])
@@ -18,6 +18,7 @@ def search_music():
 
     logger.info(f"Search query: '{query}', Page token: '{page_token}'")
     try:
+        search_service: SearchService = current_app.search_service
         results = search_service.search_youtube_music(query, page_token=page_token)
         if results:
             logger.info(f"Next Page Token: {results.get('nextPageToken')}")
@@ -35,5 +36,15 @@ def autocomplete():
     if not query:
         return jsonify([])
 
-    suggestions = search_service.autocomplete_music(query)
+    google_id = session.get("google_id")
+    playlist_owner_id = None
+    if google_id:
+        user_service: UserService = current_app.user_service
+        user_doc = user_service.get_user_by_google_id(google_id)
+        playlist_owner_id = str(user_doc["_id"]) if user_doc else None
+
+    search_service: SearchService = current_app.search_service
+    suggestions = search_service.autocomplete_music(
+        query, google_id=google_id, playlist_owner_id=playlist_owner_id
+    )
     return jsonify(suggestions)
@@ -0,0 +1,38 @@
+from flask import Blueprint, jsonify, request, current_app
+from services.user_service import UserService
+from decorators.token_required import token_required
+from datetime import datetime, timezone, timedelta
+import logging
+
+stats_bp = Blueprint('stats', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_TOP_TRACKS = 50
+MAX_STATS_DAYS = 90
+
+@stats_bp.route("/api/stats", methods=["GET"])
+@token_required
+def get_listening_stats(current_user):
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), MAX_TOP_TRACKS)
+        days = min(max(int(request.args.get("days", 30)), 1), MAX_STATS_DAYS)
+    except ValueError:
+        return jsonify({"error": "Invalid limit or days."}), 400
+
+    user_id = str(current_user["google_id"])
+    user_service: UserService = current_app.user_service
+
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    since = today - timedelta(days=days - 1)
+    daily = user_service.get_daily_play_counts(user_id, since)
+    top_tracks = user_service.get_top_tracks(user_id, limit)
+    for track in top_tracks:
+        if track.get("last_played_at"):
+            track["last_played_at"] = track["last_played_at"].isoformat()
+
+    return jsonify({
+        "top_tracks": top_tracks,
+        "daily_plays": [{"day": doc["bucket_start"].date().isoformat(), "plays": doc["count"]} for doc in daily],
+        "period_plays": sum(doc["count"] for doc in daily),
+        "days": days
+    }), 200
@@ -3,7 +3,6 @@ from flask import jsonify, session, redirect, current_app
 from services.user_service import UserService
 import logging
 import traceback
-from datetime import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -22,41 +21,9 @@ def token_required(f):
                 logger.error(f"User with google_id {google_id} not found.")
                 return redirect("/unauthorized")
 
-            pubnub_client = current_app.pubnub_client
-
-            token_commands = user_doc.get("channel_token_commands")
-            expiration_commands = user_doc.get("channel_token_commands_expiration")
-            if token_commands and expiration_commands:
-                if expiration_commands.tzinfo is None:
-                    expiration_commands = expiration_commands.replace(tzinfo=timezone.utc)
-                if pubnub_client.is_token_expired(expiration_commands):
-                    new_token_commands, new_expiration_commands = pubnub_client.generate_token([user_doc['channel_name_commands']])
-                    if new_token_commands:
-                        user_service.update_user_tokens(google_id, {
-                            "channel_token_commands": new_token_commands,
-                            "channel_token_commands_expiration": new_expiration_commands
-                        })
-                        logger.info(f"Updated channel_token_commands for user {google_id}")
-                    else:
-                        logger.error("Failed to update channel_token_commands.")
-                        return jsonify({'error': 'Failed to update token'}), 500
-
-            token_status = user_doc.get('channel_token_status')
-            expiration_status = user_doc.get('channel_token_status_expiration')
-            if token_status and expiration_status:
-                if expiration_status.tzinfo is None:
-                    expiration_status = expiration_status.replace(tzinfo=timezone.utc)
-                if pubnub_client.is_token_expired(expiration_status):
-                    new_token_status, new_expiration_status = pubnub_client.generate_token([user_doc['channel_name_status']])
-                    if new_token_status:
-                        user_service.update_user_tokens(google_id, {
-                            "channel_token_status": new_token_status,
-                            "channel_token_status_expiration": new_expiration_status
-                        })
-                        logger.info(f"Updated channel_token_status for user {google_id}")
-                    else:
-                        logger.error("Failed to update channel_token_status.")
-                        return jsonify({'error': 'Failed to update token'}), 500
+            if user_service.has_expired_tokens(user_doc):
+                logger.info(f"Tokens for user {google_id} expired, scheduling renewal.")
+                current_app.token_renewal_service.request_renewal(user_doc)
 
             return f(current_user=user_doc, *args, **kwargs)
         except Exception as e:
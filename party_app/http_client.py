@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+class RetryableStatusError(requests.RequestException):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self):
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(buckets_ms) + 1)
+        self._count = 0
+        self._total_ms = 0.0
+
+    def observe(self, seconds):
+        ms = seconds * 1000
+        index = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._total_ms += ms
+
+    def snapshot(self):
+        with self._lock:
+            buckets = {f"le_{bound}ms": count for bound, count in zip(self.buckets_ms, self._counts)}
+            buckets[f"gt_{self.buckets_ms[-1]}ms"] = self._counts[-1]
+            return {
+                "count": self._count,
+                "avg_ms": round(self._total_ms / self._count, 2) if self._count else 0.0,
+                "buckets": buckets
+            }
+
+class HttpClient:
+    def __init__(self, base_url, timeouts=None, default_timeout=5, max_retries=2,
+                 backoff_base=0.2, pool_size=20, breaker_threshold=5, breaker_reset=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._histograms = {}
+        self._counters = {}
+
+    def _endpoint_state(self, name):
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+                self._histograms[name] = LatencyHistogram()
+                self._counters[name] = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0}
+            return self._breakers[name], self._histograms[name], self._counters[name]
+
+    def _backoff(self, attempt):
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    def get(self, path, params=None, name=None):
+        name = name or path.strip("/")
+        breaker, histogram, counters = self._endpoint_state(name)
+        if not breaker.allow_request():
+            counters["rejected"] += 1
+            raise CircuitOpenError(f"Circuit open for endpoint '{name}'")
+
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        timeout = self.timeouts.get(name, self.default_timeout)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                counters["retries"] += 1
+                time.sleep(self._backoff(attempt))
+            counters["requests"] += 1
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+                histogram.observe(time.monotonic() - started)
+                if response.status_code in RETRY_STATUS_CODES:
+                    last_error = RetryableStatusError(f"{response.status_code} from {name}", response=response)
+                    continue
+                response.raise_for_status()
+                breaker.record_success()
+                return response.json()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                histogram.observe(time.monotonic() - started)
+                last_error = e
+            except requests.RequestException:
+                # Non-retryable client errors (bad params, quota) don't mean the upstream is down.
+                breaker.record_success()
+                raise
+
+        counters["failures"] += 1
+        breaker.record_failure()
+        logger.warning(f"[HttpClient] '{name}' failed after {self.max_retries + 1} attempts: {last_error}")
+        raise last_error
+
+    def stats(self):
+        with self._lock:
+            names = list(self._breakers)
+        return {
+            name: {
+                "state": self._breakers[name].state,
+                "latency": self._histograms[name].snapshot(),
+                **self._counters[name]
+            }
+            for name in names
+        }
@@ -1,21 +1,29 @@
-from pymongo import MongoClient
-from datetime import datetime, timezone
+from pymongo import MongoClient, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timezone, timedelta
 import os
 import logging
 
+from pagination import keyset_filter
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 MONGODB_URI = os.getenv("MONGODB_URI")
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "90"))
 mongo_client = MongoClient(MONGODB_URI)
 db = mongo_client["party_sense_db"]
 
 users_collection = db["users"]
 playlists_collection = db["playlists"]
 favorites_collection = db["favorites"]
+favorite_songs_collection = db["favorite_songs"]
 categories_collection = db["categories"]
 current_playback_collection = db["current_playback"]
 playback_history_collection = db["playback_history"]
+playback_history_buckets_collection = db["playback_history_buckets"]
+track_stats_collection = db["track_stats"]
+video_metadata_collection = db["video_metadata"]
 
 def create_indexes():
     try:
@@ -24,21 +32,62 @@ def create_indexes():
             users_collection.create_index("google_id", unique=True)
             logger.info("Unique index on google_id created.")
 
+        for field in ["channel_token_commands_expiration", "channel_token_status_expiration"]:
+            if f"{field}_1" not in existing_indexes:
+                users_collection.create_index(field)
+                logger.info(f"Index on {field} created.")
+
         existing_playback_history_idx = playback_history_collection.index_information()
         if "google_id_1_played_at_-1" not in existing_playback_history_idx:
             playback_history_collection.create_index([("google_id", 1), ("played_at", -1)])
             logger.info("Compound index on playback_history created.")
+        # Legacy rows are moved into buckets by `flask migrate-history`, never expired in place.
+        if "expireAfterSeconds" in existing_playback_history_idx.get("played_at_1", {}):
+            playback_history_collection.drop_index("played_at_1")
+            logger.info("Dropped TTL index on played_at for legacy playback_history.")
+
+        existing_history_buckets_idx = playback_history_buckets_collection.index_information()
+        if "google_id_1_bucket_start_1" not in existing_history_buckets_idx:
+            playback_history_buckets_collection.create_index([("google_id", 1), ("bucket_start", 1)], unique=True)
+            logger.info("Unique index on (google_id, bucket_start) for playback_history_buckets created.")
+        if "expires_at_1" in existing_history_buckets_idx:
+            playback_history_buckets_collection.drop_index("expires_at_1")
+            logger.info("Dropped TTL index on expires_at for playback_history_buckets.")
+        # A bucket covers one UTC day, so it expires one day after its retention window ends.
+        _ensure_ttl_index(
+            playback_history_buckets_collection, "bucket_start",
+            (HISTORY_RETENTION_DAYS + 1) * 86400, existing_history_buckets_idx
+        )
+
+        existing_track_stats_idx = track_stats_collection.index_information()
+        if "google_id_1_video_id_1" not in existing_track_stats_idx:
+            track_stats_collection.create_index([("google_id", 1), ("video_id", 1)], unique=True)
+            logger.info("Unique index on (google_id, video_id) for track_stats created.")
+        if "google_id_1_play_count_-1" not in existing_track_stats_idx:
+            track_stats_collection.create_index([("google_id", 1), ("play_count", -1)])
+            logger.info("Index on (google_id, play_count) for track_stats created.")
 
         existing_playlists_idx = playlists_collection.index_information()
         if "google_id_1" not in existing_playlists_idx:
             playlists_collection.create_index("google_id")
             logger.info("Index on google_id for playlists created.")
+        if "google_id_1_updated_at_-1__id_-1" not in existing_playlists_idx:
+            playlists_collection.create_index([("google_id", 1), ("updated_at", -1), ("_id", -1)])
+            logger.info("Compound index on (google_id, updated_at) for playlists created.")
 
         existing_favorites_idx = favorites_collection.index_information()
         if "google_id_1" not in existing_favorites_idx:
             favorites_collection.create_index("google_id")
             logger.info("Index on google_id for favorites created.")
 
+        existing_favorite_songs_idx = favorite_songs_collection.index_information()
+        if "google_id_1_video_id_1" not in existing_favorite_songs_idx:
+            favorite_songs_collection.create_index([("google_id", 1), ("video_id", 1)], unique=True)
+            logger.info("Unique index on (google_id, video_id) for favorite_songs created.")
+        if "google_id_1_added_at_1__id_1" not in existing_favorite_songs_idx:
+            favorite_songs_collection.create_index([("google_id", 1), ("added_at", 1), ("_id", 1)])
+            logger.info("Compound index on (google_id, added_at) for favorite_songs created.")
+
         existing_categories_idx = categories_collection.index_information()
         if "google_id_1" not in existing_categories_idx:
             categories_collection.create_index("google_id")
@@ -49,9 +98,28 @@ def create_indexes():
             current_playback_collection.create_index("google_id", unique=True)
             logger.info("Unique index on google_id for current_playback created.")
 
+        existing_video_metadata_idx = video_metadata_collection.index_information()
+        if "video_id_1" not in existing_video_metadata_idx:
+            video_metadata_collection.create_index("video_id", unique=True)
+            logger.info("Unique index on video_id for video_metadata created.")
+        _ensure_ttl_index(video_metadata_collection, "expires_at", 0, existing_video_metadata_idx)
+
     except Exception as e:
         logger.error(f"Error during creating indexes: {e}")
 
+def _ensure_ttl_index(collection, field, expire_after_seconds, existing_indexes):
+    # create_index never changes the TTL of an existing index, so a new retention setting goes through collMod.
+    index = existing_indexes.get(f"{field}_1")
+    if index is None:
+        collection.create_index(field, expireAfterSeconds=expire_after_seconds)
+        logger.info(f"TTL index on {field} for {collection.name} created.")
+    elif index.get("expireAfterSeconds") != expire_after_seconds:
+        db.command(
+            "collMod", collection.name,
+            index={"keyPattern": {field: 1}, "expireAfterSeconds": expire_after_seconds}
+        )
+        logger.info(f"TTL index on {field} for {collection.name} set to {expire_after_seconds}s.")
+
 
 def get_user_by_google_id(google_id):
     return users_collection.find_one({"google_id": google_id})
@@ -65,6 +133,29 @@ def update_user_token(google_id, tokens):
         {"$set": tokens}
     )
 
+def find_users_with_expiring_tokens(before):
+    return users_collection.find(
+        {"$or": [
+            {"channel_token_commands_expiration": {"$lt": before}},
+            {"channel_token_status_expiration": {"$lt": before}}
+        ]},
+        {
+            "google_id": 1,
+            "channel_name_commands": 1,
+            "channel_name_status": 1,
+            "channel_token_commands_expiration": 1,
+            "channel_token_status_expiration": 1
+        }
+    )
+
+def update_users_tokens(updates):
+    operations = [
+        UpdateOne({"google_id": google_id}, {"$set": tokens})
+        for google_id, tokens in updates.items()
+    ]
+    if operations:
+        users_collection.bulk_write(operations, ordered=False)
+
 def save_preferences(google_id, preferences):
     users_collection.update_one(
         {"google_id": google_id},
@@ -76,13 +167,170 @@ def get_preferences(google_id):
     user = users_collection.find_one({"google_id": google_id}, {"preferences": 1})
     return user.get("preferences") if user else None
 
-def log_playback_history(google_id, video_id, title):
-    playback_history_collection.insert_one({
-        "google_id": google_id,
-        "video_id": video_id,
-        "title": title,
-        "played_at": datetime.now(timezone.utc)
-    })
+def bulk_append_playback_history(events):
+    # One document per user per UTC day; plays are appended to it instead of inserted one by one.
+    # Returns the events whose bucket update failed so the caller can retry just those.
+    buckets = {}
+    for event in events:
+        bucket_start = event["played_at"].replace(hour=0, minute=0, second=0, microsecond=0)
+        buckets.setdefault((event["google_id"], bucket_start), []).append(event)
+
+    groups = list(buckets.items())
+    operations = []
+    for (google_id, bucket_start), group in groups:
+        plays = [
+            {"video_id": event["video_id"], "title": event["title"], "played_at": event["played_at"]}
+            for event in group
+        ]
+        operations.append(UpdateOne(
+            {"google_id": google_id, "bucket_start": bucket_start},
+            {
+                "$push": {"plays": {"$each": plays}},
+                "$inc": {"count": len(plays)},
+                "$min": {"first_played_at": plays[0]["played_at"]},
+                "$max": {"last_played_at": plays[-1]["played_at"]}
+            },
+            upsert=True
+        ))
+    if not operations:
+        return []
+    try:
+        playback_history_buckets_collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        # Unordered: every operation not listed in writeErrors was applied and must not be replayed.
+        failed = []
+        for error in e.details.get("writeErrors", []):
+            failed.extend(groups[error["index"]][1])
+        return failed
+    return []
+
+def bulk_increment_track_stats(events):
+    tracks = {}
+    for event in events:
+        key = (event["google_id"], event["video_id"])
+        entry = tracks.setdefault(key, {"count": 0, "first": event["played_at"], "last": event["played_at"]})
+        entry["count"] += 1
+        entry["title"] = event["title"]
+        entry["first"] = min(entry["first"], event["played_at"])
+        entry["last"] = max(entry["last"], event["played_at"])
+
+    operations = [
+        UpdateOne(
+            {"google_id": google_id, "video_id": video_id},
+            {
+                "$inc": {"play_count": entry["count"]},
+                "$set": {"title": entry["title"]},
+                "$min": {"first_played_at": entry["first"]},
+                "$max": {"last_played_at": entry["last"]}
+            },
+            upsert=True
+        )
+        for (google_id, video_id), entry in tracks.items()
+    ]
+    if operations:
+        track_stats_collection.bulk_write(operations, ordered=False)
+
+def migrate_legacy_playback_history(batch_size=1000):
+    # Moves rows of the pre-bucket playback_history collection into buckets and counts them in track_stats.
+    # Each batch is deleted only after its buckets were written, so an interrupted run can simply be resumed.
+    # Plays older than HISTORY_RETENTION_DAYS still count towards lifetime stats before their bucket expires.
+    migrated = 0
+    skipped = []
+    while True:
+        query = {"_id": {"$nin": skipped}} if skipped else {}
+        rows = list(playback_history_collection.find(query).sort("_id", 1).limit(batch_size))
+        if not rows:
+            break
+        events = [
+            {
+                "_id": row["_id"],
+                "google_id": row["google_id"],
+                "video_id": row["video_id"],
+                "title": row.get("title", ""),
+                "played_at": row["played_at"]
+            }
+            for row in rows
+        ]
+        failed_ids = {event["_id"] for event in bulk_append_playback_history(events)}
+        written = [event for event in events if event["_id"] not in failed_ids]
+        bulk_increment_track_stats(written)
+        playback_history_collection.delete_many({"_id": {"$in": [event["_id"] for event in written]}})
+        skipped.extend(failed_ids)
+        migrated += len(written)
+    if migrated:
+        logger.info(f"Migrated {migrated} legacy playback history rows to playback_history_buckets.")
+    if skipped:
+        logger.warning(f"{len(skipped)} legacy playback history rows could not be migrated; run the migration again.")
+    return migrated
+
+def get_top_tracks(google_id, limit):
+    return list(
+        track_stats_collection.find(
+            {"google_id": google_id},
+            {"_id": 0, "video_id": 1, "title": 1, "play_count": 1, "last_played_at": 1}
+        ).sort("play_count", -1).limit(limit)
+    )
+
+def get_daily_play_counts(google_id, since):
+    return list(
+        playback_history_buckets_collection.find(
+            {"google_id": google_id, "bucket_start": {"$gte": since}},
+            {"_id": 0, "bucket_start": 1, "count": 1}
+        ).sort("bucket_start", 1)
+    )
+
+def rebuild_track_stats(google_id=None):
+    # Repairs the incremental counters from the bucketed history, e.g. after a failed stats write.
+    # Buckets only cover the last HISTORY_RETENTION_DAYS, so counters are only ever raised: lifetime
+    # totals of expired plays survive, and increments flushed while the rebuild runs are not overwritten.
+    match = {"google_id": google_id} if google_id else {}
+    playback_history_buckets_collection.aggregate([
+        {"$match": match},
+        {"$unwind": "$plays"},
+        {"$sort": {"plays.played_at": 1}},
+        {"$group": {
+            "_id": {"google_id": "$google_id", "video_id": "$plays.video_id"},
+            "play_count": {"$sum": 1},
+            "title": {"$last": "$plays.title"},
+            "first_played_at": {"$min": "$plays.played_at"},
+            "last_played_at": {"$max": "$plays.played_at"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "google_id": "$_id.google_id",
+            "video_id": "$_id.video_id",
+            "play_count": 1,
+            "title": 1,
+            "first_played_at": 1,
+            "last_played_at": 1
+        }},
+        {"$merge": {
+            "into": "track_stats",
+            "on": ["google_id", "video_id"],
+            "whenMatched": [{"$set": {
+                "play_count": {"$max": ["$play_count", "$$new.play_count"]},
+                "title": {"$cond": [
+                    {"$gte": ["$$new.last_played_at", "$last_played_at"]}, "$$new.title", "$title"
+                ]},
+                "first_played_at": {"$min": ["$first_played_at", "$$new.first_played_at"]},
+                "last_played_at": {"$max": ["$last_played_at", "$$new.last_played_at"]}
+            }}],
+            "whenNotMatched": "insert"
+        }}
+    ])
+    return track_stats_collection.count_documents(match)
+
+def get_recent_playback_history(google_id, limit):
+    # Every bucket holds at least one play, so the newest `limit` buckets cover the newest `limit` plays.
+    return playback_history_buckets_collection.aggregate([
+        {"$match": {"google_id": google_id}},
+        {"$sort": {"bucket_start": -1}},
+        {"$limit": limit},
+        {"$unwind": "$plays"},
+        {"$sort": {"plays.played_at": -1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "video_id": "$plays.video_id", "title": "$plays.title"}}
+    ])
 
 def get_all_users():
     return users_collection.find({})
@@ -93,51 +341,198 @@ def create_playlist(google_id, name, description=""):
         "name": name,
         "description": description,
         "songs": [],
+        "song_count": 0,
+        "version": 0,
         "created_at": datetime.now(timezone.utc),
         "updated_at": datetime.now(timezone.utc)
     }
     res = playlists_collection.insert_one(doc)
     return res.inserted_id
 
-def update_playlist(playlist_id, update_data):
-    update_data["updated_at"] = datetime.now(timezone.utc)
-    playlists_collection.update_one(
-        {"_id": playlist_id},
+PLAYLIST_VERSION_PROJECTION = {"version": 1, "song_count": 1}
+
+def _playlist_filter(google_id, playlist_id, expected_version=None, **conditions):
+    query = {"_id": playlist_id, "google_id": google_id, **conditions}
+    if expected_version is not None:
+        query["version"] = expected_version
+    return query
+
+def _update_playlist_doc(query, update):
+    update.setdefault("$set", {})["updated_at"] = datetime.now(timezone.utc)
+    update.setdefault("$inc", {})["version"] = 1
+    return playlists_collection.find_one_and_update(
+        query, update, projection=PLAYLIST_VERSION_PROJECTION, return_document=ReturnDocument.AFTER
+    )
+
+def update_playlist(google_id, playlist_id, update_data, expected_version=None):
+    update_data = dict(update_data)
+    if "songs" in update_data:
+        update_data["song_count"] = len(update_data["songs"])
+    return _update_playlist_doc(
+        _playlist_filter(google_id, playlist_id, expected_version),
         {"$set": update_data}
     )
 
+def insert_playlist_songs(google_id, playlist_id, songs, position=None, expected_version=None):
+    video_ids = [song["video_id"] for song in songs]
+    push = {"$each": songs}
+    if position is not None:
+        push["$position"] = position
+    return _update_playlist_doc(
+        _playlist_filter(google_id, playlist_id, expected_version, **{"songs.video_id": {"$nin": video_ids}}),
+        {"$push": {"songs": push}, "$inc": {"song_count": len(songs)}}
+    )
+
+def _songs_without(video_id):
+    return {"$filter": {"input": "$songs", "cond": {"$ne": ["$$this.video_id", video_id]}}}
+
+def remove_playlist_song(google_id, playlist_id, video_id, expected_version=None):
+    # song_count is recounted rather than decremented, so legacy duplicate entries can't skew it.
+    query = _playlist_filter(google_id, playlist_id, expected_version, **{"songs.video_id": video_id})
+    return playlists_collection.find_one_and_update(
+        query,
+        [
+            {"$set": {"songs": _songs_without(video_id)}},
+            {"$set": {
+                "song_count": {"$size": "$songs"},
+                "version": {"$add": ["$version", 1]},
+                "updated_at": datetime.now(timezone.utc)
+            }}
+        ],
+        projection=PLAYLIST_VERSION_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+
+def move_playlist_song(google_id, playlist_id, video_id, position, expected_version=None):
+    # $pull and $push can't target the same array in one update, so the move is a pipeline update.
+    moved = {"$filter": {"input": "$songs", "cond": {"$eq": ["$$this.video_id", video_id]}}}
+    query = _playlist_filter(google_id, playlist_id, expected_version, **{"songs.video_id": video_id})
+    return playlists_collection.find_one_and_update(
+        query,
+        [
+            {"$set": {
+                "songs": {"$let": {
+                    "vars": {"others": _songs_without(video_id)},
+                    "in": {"$concatArrays": [
+                        {"$slice": ["$$others", position]},
+                        {"$slice": [moved, 1]},
+                        {"$slice": ["$$others", position, {"$max": [{"$size": "$$others"}, 1]}]}
+                    ]}
+                }}
+            }},
+            {"$set": {
+                "song_count": {"$size": "$songs"},
+                "version": {"$add": ["$version", 1]},
+                "updated_at": datetime.now(timezone.utc)
+            }}
+        ],
+        projection=PLAYLIST_VERSION_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+
+def get_playlist_version(google_id, playlist_id):
+    return playlists_collection.find_one({"_id": playlist_id, "google_id": google_id}, PLAYLIST_VERSION_PROJECTION)
+
 def get_playlists(google_id):
     return playlists_collection.find({"google_id": google_id})
 
+PLAYLIST_SUMMARY_PROJECTION = {
+    "name": 1, "description": 1, "song_count": 1, "version": 1, "created_at": 1, "updated_at": 1
+}
+
+def get_playlist_summaries(google_id, limit, after=None):
+    query = {"google_id": google_id, **keyset_filter("updated_at", after, descending=True)}
+    return list(
+        playlists_collection.find(query, PLAYLIST_SUMMARY_PROJECTION)
+        .sort([("updated_at", -1), ("_id", -1)])
+        .limit(limit)
+    )
+
+def get_playlist_songs(google_id, playlist_id, offset, limit):
+    return playlists_collection.find_one(
+        {"_id": playlist_id, "google_id": google_id},
+        {"songs": {"$slice": [offset, limit]}, "song_count": 1, "version": 1}
+    )
+
+def backfill_playlist_fields():
+    res = playlists_collection.update_many(
+        {"song_count": {"$exists": False}},
+        [{"$set": {"song_count": {"$size": {"$ifNull": ["$songs", []]}}}}]
+    )
+    if res.modified_count:
+        logger.info(f"Backfilled song_count for {res.modified_count} playlists.")
+    res = playlists_collection.update_many({"version": {"$exists": False}}, {"$set": {"version": 0}})
+    if res.modified_count:
+        logger.info(f"Backfilled version for {res.modified_count} playlists.")
+
+def iter_playlist_songs(owner_id):
+    # Playlists are keyed by the owner's user document _id (as a string), not the Google ID.
+    for doc in playlists_collection.find({"google_id": owner_id}, {"songs.video_id": 1, "songs.title": 1}):
+        yield from doc.get("songs", [])
+
 def delete_playlist(google_id, playlist_id):
     res = playlists_collection.delete_one({"_id": playlist_id, "google_id": google_id})
     return res.deleted_count > 0
 
-def create_favorites(google_id):
-    doc = {
-        "google_id": google_id,
-        "songs": [],
-        "created_at": datetime.now(timezone.utc),
-        "updated_at": datetime.now(timezone.utc)
-    }
-    res = favorites_collection.insert_one(doc)
-    return res.inserted_id
+FAVORITE_SONG_PROJECTION = {"video_id": 1, "title": 1, "thumbnail_url": 1, "duration": 1, "added_at": 1}
 
 def add_favorite(google_id, song):
-    favorites_collection.update_one(
-        {"google_id": google_id},
-        {"$push": {"songs": song}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+    res = favorite_songs_collection.update_one(
+        {"google_id": google_id, "video_id": song["video_id"]},
+        {"$setOnInsert": dict(song, google_id=google_id)},
         upsert=True
     )
+    return res.upserted_id is not None
 
 def remove_favorite(google_id, video_id):
-    favorites_collection.update_one(
-        {"google_id": google_id},
-        {"$pull": {"songs": {"video_id": video_id}}, "$set": {"updated_at": datetime.now(timezone.utc)}}
+    res = favorite_songs_collection.delete_one({"google_id": google_id, "video_id": video_id})
+    return res.deleted_count > 0
+
+def is_favorite(google_id, video_id):
+    return favorite_songs_collection.find_one({"google_id": google_id, "video_id": video_id}, {"_id": 1}) is not None
+
+def get_favorites_page(google_id, limit, after=None):
+    query = {"google_id": google_id, **keyset_filter("added_at", after)}
+    return list(
+        favorite_songs_collection.find(query, FAVORITE_SONG_PROJECTION)
+        .sort([("added_at", 1), ("_id", 1)])
+        .limit(limit)
     )
 
-def get_favorites(google_id):
-    return favorites_collection.find_one({"google_id": google_id})
+def get_favorites_after(google_id, video_id, limit):
+    current = favorite_songs_collection.find_one(
+        {"google_id": google_id, "video_id": video_id}, {"added_at": 1}
+    )
+    after = (current["added_at"], current["_id"]) if current else None
+    return get_favorites_page(google_id, limit, after)
+
+def iter_favorite_songs(google_id):
+    yield from favorite_songs_collection.find({"google_id": google_id}, {"video_id": 1, "title": 1})
+
+def migrate_favorites_arrays():
+    # Moves legacy per-user 'songs' arrays into one favorite_songs row per (google_id, video_id).
+    migrated = 0
+    for doc in favorites_collection.find({"songs.0": {"$exists": True}}):
+        google_id = doc["google_id"]
+        fallback_added_at = doc.get("created_at") or datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"google_id": google_id, "video_id": song["video_id"]},
+                {"$setOnInsert": dict(song, google_id=google_id, added_at=song.get("added_at") or fallback_added_at)},
+                upsert=True
+            )
+            for song in doc["songs"] if song.get("video_id")
+        ]
+        if operations:
+            favorite_songs_collection.bulk_write(operations, ordered=False)
+        favorites_collection.update_one(
+            {"_id": doc["_id"]},
+            {"$unset": {"songs": ""}, "$set": {"migrated_at": datetime.now(timezone.utc)}}
+        )
+        migrated += 1
+    if migrated:
+        logger.info(f"Migrated favorites arrays of {migrated} users to favorite_songs.")
+    return migrated
 
 def create_category(google_id, name, description=""):
     cat = {
@@ -172,3 +567,31 @@ def update_current_playback(google_id, current_song):
         upsert=True
     )
     logger.info(f"[mongodb_client] update_current_playback => matched_count={result.matched_count}, modified_count={result.modified_count}")
+
+def bulk_update_current_playback(states):
+    operations = [
+        UpdateOne({"google_id": google_id}, {"$set": {"current_song": current_song}}, upsert=True)
+        for google_id, current_song in states.items()
+    ]
+    if operations:
+        result = current_playback_collection.bulk_write(operations, ordered=False)
+        logger.info(f"[mongodb_client] bulk_update_current_playback => matched_count={result.matched_count}, upserted_count={result.upserted_count}")
+
+def get_cached_videos_details(video_ids):
+    return video_metadata_collection.find(
+        {"video_id": {"$in": video_ids}, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+        {"video_id": 1, "details": 1}
+    )
+
+def save_cached_videos_details(entries):
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(
+            {"video_id": video_id},
+            {"$set": {"details": details, "expires_at": now + timedelta(seconds=ttl)}},
+            upsert=True
+        )
+        for video_id, details, ttl in entries
+    ]
+    if operations:
+        video_metadata_collection.bulk_write(operations, ordered=False)
@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+from bson.objectid import ObjectId
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(sort_value, doc_id):
+    millis = int(sort_value.replace(tzinfo=sort_value.tzinfo or timezone.utc).timestamp() * 1000)
+    return f"{millis}_{doc_id}"
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        millis, doc_id = cursor.split("_", 1)
+        return datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc), ObjectId(doc_id)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        limit = int(value) if value is not None else default
+    except ValueError:
+        raise ValueError("Invalid limit.")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def keyset_filter(field, cursor, descending=False):
+    if cursor is None:
+        return {}
+    value, doc_id = cursor
+    op = "$lt" if descending else "$gt"
+    return {"$or": [{field: {op: value}}, {field: value, "_id": {op: doc_id}}]}
@@ -0,0 +1,114 @@
+import os
+import queue
+import time
+import zlib
+import threading
+import logging
+
+from http_client import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+STATUS_SHARDS = int(os.getenv("STATUS_SHARDS", "4"))
+STATUS_QUEUE_SIZE = int(os.getenv("STATUS_QUEUE_SIZE", "1000"))
+STATUS_OVERFLOW_POLICY = os.getenv("STATUS_OVERFLOW_POLICY", "drop_oldest")
+
+_STOP = object()
+
+class StatusPipeline:
+    def __init__(self, handler, shards=STATUS_SHARDS, queue_size=STATUS_QUEUE_SIZE, overflow_policy=STATUS_OVERFLOW_POLICY):
+        if overflow_policy not in ["drop_oldest", "drop_newest"]:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}'")
+        self.handler = handler
+        self.overflow_policy = overflow_policy
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(shards)]
+        self._threads = []
+        self._lock = threading.Lock()
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.queue_latency = LatencyHistogram()
+        self.processing_latency = LatencyHistogram()
+
+    def start(self):
+        if self._threads:
+            return
+        for index, shard in enumerate(self._queues):
+            thread = threading.Thread(target=self._worker, args=(shard,), name=f"status-shard-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        for shard in self._queues:
+            shard.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _shard_for(self, message):
+        user_id = str(message.get("user_id", "")) if isinstance(message, dict) else ""
+        return self._queues[zlib.crc32(user_id.encode()) % len(self._queues)]
+
+    def submit(self, message):
+        shard = self._shard_for(message)
+        item = (time.monotonic(), message)
+        with self._lock:
+            self.received += 1
+        try:
+            shard.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        with self._lock:
+            self.dropped += 1
+        if self.overflow_policy == "drop_newest":
+            logger.warning("[StatusPipeline] Shard queue full, dropping newest status message.")
+            return False
+
+        try:
+            shard.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            shard.put_nowait(item)
+        except queue.Full:
+            logger.warning("[StatusPipeline] Shard queue still full, dropping status message.")
+            return False
+        logger.warning("[StatusPipeline] Shard queue full, dropped oldest status message.")
+        return True
+
+    def _worker(self, shard):
+        while True:
+            item = shard.get()
+            if item is _STOP:
+                return
+            enqueued_at, message = item
+            started = time.monotonic()
+            self.queue_latency.observe(started - enqueued_at)
+            try:
+                self.handler(message)
+            except Exception as e:
+                logger.error(f"[StatusPipeline] Error processing status message: {e}")
+                with self._lock:
+                    self.errors += 1
+            self.processing_latency.observe(time.monotonic() - started)
+            with self._lock:
+                self.processed += 1
+
+    def stats(self):
+        with self._lock:
+            counters = {
+                "received": self.received,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "errors": self.errors
+            }
+        return {
+            **counters,
+            "overflow_policy": self.overflow_policy,
+            "queue_depths": [shard.qsize() for shard in self._queues],
+            "queue_latency": self.queue_latency.snapshot(),
+            "processing_latency": self.processing_latency.snapshot()
+        }
@@ -3,6 +3,7 @@ from youtube_api import (
     play_youtube_music,
     control_music as control_music_func,
     fetch_video_title,
+    get_videos_details,
     autocomplete_music
 )
 
@@ -21,3 +22,6 @@ class MusicService:
 
     def fetch_video_title(self, video_id):
         return fetch_video_title(video_id)
+
+    def get_videos_details(self, video_ids):
+        return get_videos_details(video_ids)
@@ -0,0 +1,91 @@
+import os
+import time
+import threading
+from datetime import datetime
+
+PLAYBACK_POSITION_TOLERANCE = float(os.getenv("PLAYBACK_POSITION_TOLERANCE", "2"))
+
+BROWSER_EXCLUDED_FIELDS = ["stream_url"]
+
+def user_room(google_id):
+    return f"user_{google_id}"
+
+def serialize_song(song):
+    if not song:
+        return song
+    return {k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in song.items()}
+
+def browser_song(song):
+    return {k: v for k, v in serialize_song(song).items() if k not in BROWSER_EXCLUDED_FIELDS}
+
+def playback_clock(song):
+    return {
+        "position": song.get("position", 0),
+        "server_ts": int(time.time() * 1000),
+        "rate": 1.0 if song.get("state") == "playing" else 0.0
+    }
+
+class PlaybackEventEncoder:
+    def __init__(self, position_tolerance=PLAYBACK_POSITION_TOLERANCE):
+        self.position_tolerance = position_tolerance
+        self._lock = threading.Lock()
+        self._last = {}
+        self.snapshots = 0
+        self.deltas = 0
+        self.suppressed = 0
+
+    def build_snapshot(self, user_id, current_song):
+        song = browser_song(current_song)
+        return {
+            "user_id": user_id,
+            "type": "snapshot",
+            "current_song": song,
+            "clock": playback_clock(song)
+        }
+
+    def snapshot(self, user_id, current_song):
+        payload = self.build_snapshot(user_id, current_song)
+        with self._lock:
+            self._last[user_id] = {"song": payload["current_song"], "clock": payload["clock"]}
+            self.snapshots += 1
+        return payload
+
+    def delta(self, user_id, current_song):
+        song = browser_song(current_song)
+        clock = playback_clock(song)
+        with self._lock:
+            last = self._last.get(user_id)
+            if last is None:
+                self._last[user_id] = {"song": song, "clock": clock}
+                self.snapshots += 1
+                return {"user_id": user_id, "type": "snapshot", "current_song": song, "clock": clock}
+
+            changes = {
+                k: v for k, v in song.items()
+                if k != "position" and last["song"].get(k) != v
+            }
+            last_clock = last["clock"]
+            elapsed = (clock["server_ts"] - last_clock["server_ts"]) / 1000
+            predicted = last_clock["position"] + elapsed * last_clock["rate"]
+            position_jump = abs(clock["position"] - predicted) > self.position_tolerance
+
+            if not changes and not position_jump:
+                self.suppressed += 1
+                return None
+
+            self._last[user_id] = {"song": dict(last["song"], **song), "clock": clock}
+            self.deltas += 1
+            return {"user_id": user_id, "type": "delta", "changes": changes, "clock": clock}
+
+    def forget(self, user_id):
+        with self._lock:
+            self._last.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._last),
+                "snapshots": self.snapshots,
+                "deltas": self.deltas,
+                "suppressed": self.suppressed
+            }
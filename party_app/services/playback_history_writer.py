@@ -0,0 +1,119 @@
+import os
+import threading
+import logging
+from datetime import datetime, timezone
+
+from mongodb_client import bulk_append_playback_history, bulk_increment_track_stats
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "5"))
+HISTORY_FLUSH_SIZE = int(os.getenv("HISTORY_FLUSH_SIZE", "100"))
+HISTORY_MAX_BUFFER = int(os.getenv("HISTORY_MAX_BUFFER", "10000"))
+
+class PlaybackHistoryWriter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer = []
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.recorded = 0
+        self.flushes = 0
+        self.flushed_events = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.failed_stats_updates = 0
+
+    def record(self, google_id, video_id, title):
+        event = {
+            "google_id": google_id,
+            "video_id": video_id,
+            "title": title,
+            "played_at": datetime.now(timezone.utc)
+        }
+        with self._lock:
+            self.recorded += 1
+            self._buffer.append(event)
+            self._trim()
+            full = len(self._buffer) >= HISTORY_FLUSH_SIZE
+        if full:
+            self._wake_event.set()
+
+    def _trim(self):
+        overflow = len(self._buffer) - HISTORY_MAX_BUFFER
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._buffer:
+                    return 0
+                batch, self._buffer = self._buffer, []
+            try:
+                failed = bulk_append_playback_history(batch)
+            except Exception as e:
+                logger.error(f"[PlaybackHistoryWriter] Error flushing {len(batch)} history events: {e}")
+                with self._lock:
+                    self.failed_flushes += 1
+                    self._buffer[:0] = batch
+                    self._trim()
+                return 0
+            if failed:
+                # Only the buckets that were rejected are retried; the rest are already stored.
+                logger.error(f"[PlaybackHistoryWriter] {len(failed)} of {len(batch)} history events were not written, retrying later.")
+                failed_ids = {id(event) for event in failed}
+                batch = [event for event in batch if id(event) not in failed_ids]
+                with self._lock:
+                    self.failed_flushes += 1
+                    self._buffer[:0] = failed
+                    self._trim()
+                if not batch:
+                    return 0
+            with self._lock:
+                self.flushes += 1
+                self.flushed_events += len(batch)
+            # History is already written, so a failed counter update is not retried; rebuild-stats repairs it.
+            try:
+                bulk_increment_track_stats(batch)
+            except Exception as e:
+                logger.error(f"[PlaybackHistoryWriter] Error updating track stats for {len(batch)} events: {e}")
+                with self._lock:
+                    self.failed_stats_updates += 1
+        logger.debug(f"[PlaybackHistoryWriter] Flushed {len(batch)} history events.")
+        return len(batch)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(HISTORY_FLUSH_INTERVAL)
+            self._wake_event.clear()
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "buffered": len(self._buffer),
+                "recorded": self.recorded,
+                "flushes": self.flushes,
+                "flushed_events": self.flushed_events,
+                "failed_flushes": self.failed_flushes,
+                "dropped": self.dropped,
+                "failed_stats_updates": self.failed_stats_updates
+            }
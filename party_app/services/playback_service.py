@@ -0,0 +1,376 @@
+import os
+import time
+import uuid
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from cache import TTLCache
+from services.playback_events import user_room
+from youtube_api import get_video_details
+
+logger = logging.getLogger(__name__)
+
+PLAYBACK_WORKERS = int(os.getenv("PLAYBACK_WORKERS", "8"))
+PLAYBACK_JOB_TTL = int(os.getenv("PLAYBACK_JOB_TTL", "600"))
+PLAYBACK_CONFIRM_TIMEOUT = float(os.getenv("PLAYBACK_CONFIRM_TIMEOUT", "10"))
+
+ASYNC_ACTIONS = ["play", "pause", "next", "previous", "seek", "set_mode", "set_motion_detection"]
+# The device picks the next/previous track, so these jobs finish when its status report confirms the switch.
+TRACK_CHANGE_ACTIONS = ["next", "previous"]
+
+class PlaybackService:
+    def __init__(self, user_service, stream_service, prefetch_service, search_service,
+                 pubnub_client, socketio, playback_events):
+        self.user_service = user_service
+        self.stream_service = stream_service
+        self.prefetch_service = prefetch_service
+        self.search_service = search_service
+        self.pubnub_client = pubnub_client
+        self.socketio = socketio
+        self.playback_events = playback_events
+        self._executor = ThreadPoolExecutor(max_workers=PLAYBACK_WORKERS, thread_name_prefix="playback")
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._jobs = TTLCache(max_size=4096, ttl=PLAYBACK_JOB_TTL)
+        self._awaiting_device = {}
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.confirmed = 0
+        self.unconfirmed = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def submit(self, user_doc, data):
+        google_id = user_doc["google_id"]
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "user_id": google_id,
+            "action": data.get("action"),
+            "status": "queued",
+            "message": None,
+            "error": None,
+            "submitted_at": time.time()
+        }
+        self._jobs.set(job["job_id"], job)
+
+        with self._lock:
+            self.submitted += 1
+            queue = self._queues.get(google_id)
+            start_drain = queue is None
+            if start_drain:
+                queue = deque()
+                self._queues[google_id] = queue
+            queue.append((job, user_doc, data))
+
+        if start_drain:
+            self._executor.submit(self._drain, google_id)
+        return job
+
+    def get_job(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _drain(self, google_id):
+        while True:
+            with self._lock:
+                queue = self._queues.get(google_id)
+                if not queue:
+                    self._queues.pop(google_id, None)
+                    return
+                job, user_doc, data = queue.popleft()
+            self._run_job(job, user_doc, data)
+
+    def _run_job(self, job, user_doc, data):
+        started = time.time()
+        job["status"] = "running"
+        track_change = job["action"] in TRACK_CHANGE_ACTIONS
+        if track_change:
+            # Registered before the command is published so an early status report can't be missed.
+            self._await_device(job)
+        try:
+            message, current_song = self.execute(user_doc, data)
+            job["status"] = "done"
+            job["message"] = message
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            logger.error(f"[PlaybackService] Job {job['job_id']} ({job['action']}) failed: {e}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+            current_song = None
+            with self._lock:
+                self.failed += 1
+                if track_change and self._awaiting_device.get(job["user_id"], {}).get("job") is job:
+                    del self._awaiting_device[job["user_id"]]
+        finally:
+            finished = time.time()
+            with self._lock:
+                self.total_wait_seconds += started - job["submitted_at"]
+                self.total_run_seconds += finished - started
+
+        if track_change and job["status"] == "done":
+            with self._lock:
+                waiting = self._awaiting_device.get(job["user_id"], {}).get("job") is job
+                if waiting:
+                    job["status"] = "awaiting_device"
+            if not waiting:
+                # The device already confirmed the switch and that event carried the song.
+                return
+            timer = threading.Timer(PLAYBACK_CONFIRM_TIMEOUT, self._expire_awaiting, args=(job["user_id"], job["job_id"]))
+            timer.daemon = True
+            timer.start()
+        self._emit_job_event(job, current_song)
+
+    def _emit_job_event(self, job, current_song):
+        if current_song:
+            payload = self.playback_events.snapshot(job["user_id"], current_song)
+        else:
+            payload = {"user_id": job["user_id"]}
+        payload["job_id"] = job["job_id"]
+        payload["status"] = job["status"]
+        if job["error"]:
+            payload["error"] = job["error"]
+        self.socketio.emit('playback_update', payload, to=user_room(job["user_id"]))
+        logger.info(f"[PlaybackService] Job {job['job_id']} ({job['action']}) => {job['status']}")
+
+    def _await_device(self, job):
+        user_id = job["user_id"]
+        current = self.user_service.get_current_playback(user_id)
+        from_video_id = current.get("current_song", {}).get("video_id") if current else None
+        with self._lock:
+            superseded = self._awaiting_device.get(user_id)
+            self._awaiting_device[user_id] = {"job": job, "from_video_id": from_video_id}
+        if superseded:
+            superseded["job"]["status"] = "superseded"
+            self._emit_job_event(superseded["job"], None)
+
+    def confirm_track_change(self, user_id, current_song):
+        # Called from the status path: the first report of a different track completes the pending job.
+        with self._lock:
+            pending = self._awaiting_device.get(user_id)
+            video_id = current_song.get("video_id")
+            if not pending or not video_id or video_id == pending["from_video_id"]:
+                return False
+            del self._awaiting_device[user_id]
+            self.confirmed += 1
+        pending["job"]["status"] = "done"
+        self._emit_job_event(pending["job"], current_song)
+        return True
+
+    def _expire_awaiting(self, user_id, job_id):
+        with self._lock:
+            pending = self._awaiting_device.get(user_id)
+            if not pending or pending["job"]["job_id"] != job_id:
+                return
+            del self._awaiting_device[user_id]
+            self.unconfirmed += 1
+        logger.warning(f"[PlaybackService] Device did not confirm job {job_id} for user {user_id}.")
+        pending["job"]["status"] = "unconfirmed"
+        current = self.user_service.get_current_playback(user_id)
+        self._emit_job_event(pending["job"], current.get("current_song") if current else None)
+
+    def execute(self, user_doc, data):
+        action = data.get("action")
+        handler = getattr(self, f"_handle_{action}", None)
+        if handler is None:
+            raise ValueError(f"Unsupported playback action '{action}'")
+        return handler(user_doc, data)
+
+    def _handle_play(self, user_doc, data):
+        google_id = user_doc["google_id"]
+        video_id = data.get("video_id")
+        position = data.get("position", 0.0)
+        timestamp = data.get("timestamp", 0)
+        mode = data.get("mode", "default")
+
+        current_playback = self.user_service.get_current_playback(google_id)
+        if current_playback and "current_song" in current_playback:
+            current_song = current_playback["current_song"]
+            if (current_song["video_id"] == video_id and current_song["state"] in ["playing", "pause"]):
+                current_song["state"] = "playing"
+                current_song["position"] = position
+                current_song["updated_at"] = datetime.now(timezone.utc)
+                stream_url = self.stream_service.resolve(video_id, current_song.get("stream_url"))
+                current_song["stream_url"] = stream_url
+                self.user_service.update_current_playback(google_id, current_song)
+
+                command = {
+                    "action": "play_direct",
+                    "video_id": video_id,
+                    "stream_url": stream_url,
+                    "title": current_song["title"],
+                    "thumbnail_url": current_song["thumbnail_url"],
+                    "duration": current_song["duration"],
+                    "position": position,
+                    "timestamp": timestamp,
+                    "mode": mode
+                }
+                self.pubnub_client.publish_message(user_doc["channel_name_commands"], command)
+                logger.info(f"Updated position for same video {video_id} at position {position}.")
+                return "Play command for same video updated.", current_song
+
+        details = get_video_details(video_id)
+        fallback_title = data.get("title", "Unknown Title")
+        fallback_thumb = data.get("thumbnail_url", "")
+        fallback_duration = data.get("duration", 0)
+        if details:
+            actual_title = details["title"] or fallback_title
+            actual_thumb = details["thumbnail_url"] or fallback_thumb
+            actual_duration = details["duration_seconds"] or fallback_duration
+        else:
+            actual_title = fallback_title
+            actual_thumb = fallback_thumb
+            actual_duration = fallback_duration
+
+        direct_url = self.stream_service.resolve(video_id)
+
+        current_song = {
+            "video_id": video_id,
+            "title": actual_title,
+            "thumbnail_url": actual_thumb,
+            "duration": actual_duration,
+            "position": position,
+            "state": "playing",
+            "mode": mode,
+            "motion_detected": user_doc.get("preferences", {}).get("motion_detection", True),
+            "updated_at": datetime.now(timezone.utc),
+            "stream_url": direct_url
+        }
+        self.user_service.update_current_playback(google_id, current_song)
+        self.user_service.log_playback_history(google_id, video_id, actual_title)
+        self.search_service.record_title(actual_title, video_id, google_id=google_id)
+
+        command = {
+            "action": "play_direct",
+            "video_id": video_id,
+            "stream_url": direct_url,
+            "title": actual_title,
+            "thumbnail_url": actual_thumb,
+            "duration": actual_duration,
+            "position": position,
+            "timestamp": timestamp,
+            "mode": mode
+        }
+        self.pubnub_client.publish_message(user_doc["channel_name_commands"], command)
+        logger.info(f"Published play command: {command}")
+
+        if mode != "shuffle":
+            self.prefetch_service.prefetch_upcoming(
+                google_id, video_id, data.get("source", "search"),
+                commands_channel=user_doc["channel_name_commands"]
+            )
+        return "Play command (direct URL) sent.", current_song
+
+    def _handle_pause(self, user_doc, data):
+        google_id = user_doc["google_id"]
+        position = data.get("position", 0.0)
+        logger.info(f"[PlaybackService] 'pause' action received. position={position}, user={google_id}")
+        song = None
+        curr = self.user_service.get_current_playback(google_id)
+        if curr and "current_song" in curr:
+            song = curr["current_song"]
+            song["state"] = "pause"
+            song["position"] = position
+            song["updated_at"] = datetime.now(timezone.utc)
+            self.user_service.update_current_playback(google_id, song)
+
+        self.pubnub_client.publish_message(user_doc["channel_name_commands"], {
+            "action": "pause",
+            "position": position,
+            "timestamp": data.get("timestamp", 0)
+        })
+        return "Pause command sent.", song
+
+    def _handle_next(self, user_doc, data):
+        return self._forward_track_change(user_doc, "next")
+
+    def _handle_previous(self, user_doc, data):
+        return self._forward_track_change(user_doc, "previous")
+
+    def _forward_track_change(self, user_doc, action):
+        google_id = user_doc["google_id"]
+        logger.info(f"[PlaybackService] '{action}' action for user={google_id}")
+        self.pubnub_client.publish_message(user_doc["channel_name_commands"], {
+            "action": action
+        })
+        return f"{action.capitalize()} command sent.", None
+
+    def _handle_seek(self, user_doc, data):
+        google_id = user_doc["google_id"]
+        position = data.get("position", 0.0)
+        logger.info(f"[PlaybackService] 'seek' action. position={position}, user={google_id}")
+        song = None
+        curr = self.user_service.get_current_playback(google_id)
+        if curr and "current_song" in curr:
+            song = curr["current_song"]
+            song["position"] = position
+            song["updated_at"] = datetime.now(timezone.utc)
+            self.user_service.update_current_playback(google_id, song)
+
+        self.pubnub_client.publish_message(user_doc["channel_name_commands"], {
+            "action": "seek",
+            "position": position,
+            "timestamp": data.get("timestamp", 0)
+        })
+        return "Seek command sent.", song
+
+    def _handle_set_mode(self, user_doc, data):
+        google_id = user_doc["google_id"]
+        mode = data.get("mode", "default")
+        logger.info(f"[PlaybackService] 'set_mode'={mode}, user={google_id}")
+        song = None
+        curr = self.user_service.get_current_playback(google_id)
+        if curr and "current_song" in curr:
+            song = curr["current_song"]
+            song["mode"] = mode
+            song["updated_at"] = datetime.now(timezone.utc)
+            self.user_service.update_current_playback(google_id, song)
+
+        self.pubnub_client.publish_message(user_doc["channel_name_commands"], {
+            "action": "set_mode",
+            "mode": mode
+        })
+        return f"Set mode to {mode}.", song
+
+    def _handle_set_motion_detection(self, user_doc, data):
+        google_id = user_doc["google_id"]
+        enabled = data.get("enabled", True)
+        logger.info(f"[PlaybackService] set_motion_detection={enabled}, user={google_id}")
+        prefs = user_doc.get("preferences", {})
+        prefs["motion_detection"] = enabled
+        self.user_service.save_preferences(google_id, prefs)
+
+        song = None
+        curr = self.user_service.get_current_playback(google_id)
+        if curr and "current_song" in curr:
+            song = curr["current_song"]
+            song["motion_detected"] = enabled
+            song["updated_at"] = datetime.now(timezone.utc)
+            self.user_service.update_current_playback(google_id, song)
+
+        self.pubnub_client.publish_message(user_doc["channel_name_commands"], {
+            "action": "set_motion_detection",
+            "enabled": enabled
+        })
+        return f"Motion detection => {enabled}", song
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "awaiting_device": len(self._awaiting_device),
+                "confirmed": self.confirmed,
+                "unconfirmed": self.unconfirmed,
+                "pending": sum(len(q) for q in self._queues.values()),
+                "avg_wait_ms": round(self.total_wait_seconds / finished * 1000, 2) if finished else 0.0,
+                "avg_run_ms": round(self.total_run_seconds / finished * 1000, 2) if finished else 0.0
+            }
@@ -0,0 +1,174 @@
+import os
+import copy
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+from mongodb_client import get_current_playback, update_current_playback, bulk_update_current_playback
+
+logger = logging.getLogger(__name__)
+
+PLAYBACK_STATE_STALENESS = float(os.getenv("PLAYBACK_STATE_STALENESS", "30"))
+PLAYBACK_STATE_FLUSH_INTERVAL = float(os.getenv("PLAYBACK_STATE_FLUSH_INTERVAL", "2"))
+PLAYBACK_STATE_MAX_USERS = int(os.getenv("PLAYBACK_STATE_MAX_USERS", "10000"))
+
+class PlaybackStateStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._states = OrderedDict()
+        self._dirty = set()
+        self._version = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.reads = 0
+        self.loads = 0
+        self.flushes = 0
+        self.flushed_states = 0
+        self.forced_flushes = 0
+
+    def get(self, google_id):
+        with self._lock:
+            self.reads += 1
+            state = self._states.get(google_id)
+            fresh = state is not None and (
+                google_id in self._dirty or time.monotonic() - state["loaded_at"] < PLAYBACK_STATE_STALENESS
+            )
+            if fresh:
+                self._states.move_to_end(google_id)
+                return self._as_document(google_id, state["current_song"])
+            seen_version = state["version"] if state else None
+
+        doc = get_current_playback(google_id)
+        current_song = doc.get("current_song") if doc else None
+        with self._lock:
+            self.loads += 1
+            state = self._states.get(google_id)
+            # A put() that landed while Mongo was being read is newer than what was read.
+            if state is None or (state["version"] == seen_version and google_id not in self._dirty):
+                self._remember(google_id, current_song)
+            else:
+                current_song = state["current_song"]
+            document = self._as_document(google_id, current_song)
+        self._enforce_capacity()
+        return document
+
+    def put(self, google_id, current_song, persist=True):
+        if not persist:
+            with self._lock:
+                self._remember(google_id, copy.deepcopy(current_song))
+                self._dirty.add(google_id)
+            self._enforce_capacity()
+            return
+
+        # Serialised with flush() so an older batched state can't overwrite this write.
+        with self._write_lock:
+            with self._lock:
+                self._remember(google_id, copy.deepcopy(current_song))
+                self._dirty.discard(google_id)
+            update_current_playback(google_id, current_song)
+        self._enforce_capacity()
+
+    def _remember(self, google_id, current_song):
+        self._version += 1
+        self._states[google_id] = {"current_song": current_song, "loaded_at": time.monotonic(), "version": self._version}
+        self._states.move_to_end(google_id)
+        # Clean entries are dropped here; unflushed ones are left to _enforce_capacity().
+        while len(self._states) > PLAYBACK_STATE_MAX_USERS:
+            oldest_id = next(iter(self._states))
+            if oldest_id in self._dirty or oldest_id == google_id:
+                break
+            del self._states[oldest_id]
+
+    def _enforce_capacity(self):
+        # Over capacity only when the oldest entries are unflushed: write them out now, in the
+        # caller's thread, so a write-heavy load is slowed down instead of growing the map.
+        with self._lock:
+            if len(self._states) <= PLAYBACK_STATE_MAX_USERS:
+                return
+        with self._write_lock:
+            with self._lock:
+                excess = len(self._states) - PLAYBACK_STATE_MAX_USERS
+                evict, batch = [], {}
+                for google_id, state in self._states.items():
+                    if len(evict) + len(batch) >= excess:
+                        break
+                    if google_id in self._dirty:
+                        batch[google_id] = state["current_song"]
+                    else:
+                        evict.append(google_id)
+                for google_id in evict:
+                    del self._states[google_id]
+                self._dirty.difference_update(batch)
+            if not batch:
+                return
+            try:
+                bulk_update_current_playback(batch)
+            except Exception as e:
+                logger.error(f"[PlaybackStateStore] Error flushing {len(batch)} playback states over capacity: {e}")
+                with self._lock:
+                    self._dirty.update(gid for gid in batch if gid in self._states)
+                return
+            with self._lock:
+                self.forced_flushes += 1
+                self.flushed_states += len(batch)
+                for google_id, current_song in batch.items():
+                    state = self._states.get(google_id)
+                    # Keep entries that were updated again while the batch was being written.
+                    if state and google_id not in self._dirty and state["current_song"] is current_song:
+                        del self._states[google_id]
+
+    def _as_document(self, google_id, current_song):
+        if current_song is None:
+            return None
+        return {"google_id": google_id, "current_song": copy.deepcopy(current_song)}
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                batch = {google_id: self._states[google_id]["current_song"] for google_id in self._dirty}
+                self._dirty.clear()
+            try:
+                bulk_update_current_playback(batch)
+            except Exception as e:
+                logger.error(f"[PlaybackStateStore] Error flushing {len(batch)} playback states: {e}")
+                with self._lock:
+                    self._dirty.update(gid for gid in batch if gid in self._states)
+                return 0
+            with self._lock:
+                self.flushes += 1
+                self.flushed_states += len(batch)
+        logger.debug(f"[PlaybackStateStore] Flushed {len(batch)} playback states.")
+        return len(batch)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(PLAYBACK_STATE_FLUSH_INTERVAL):
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._states),
+                "dirty": len(self._dirty),
+                "reads": self.reads,
+                "loads": self.loads,
+                "flushes": self.flushes,
+                "flushed_states": self.flushed_states,
+                "forced_flushes": self.forced_flushes
+            }
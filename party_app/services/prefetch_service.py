@@ -0,0 +1,112 @@
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from youtube_api import get_videos_details
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "2"))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+PREFETCH_PER_USER_LIMIT = int(os.getenv("PREFETCH_PER_USER_LIMIT", "2"))
+
+class PrefetchService:
+    def __init__(self, user_service, stream_service, pubnub_client=None):
+        self.user_service = user_service
+        self.stream_service = stream_service
+        self.pubnub_client = pubnub_client
+        self._executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._inflight_users = {}
+        self._inflight_videos = set()
+        self.scheduled = 0
+        self.completed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.preloads_sent = 0
+
+    def prefetch_upcoming(self, google_id, video_id, source, commands_channel=None):
+        # Only favorites have a known play order; search results are played one at a time.
+        if source != "favorites":
+            return
+        self._executor.submit(self._prefetch_upcoming, google_id, video_id, commands_channel)
+
+    def _prefetch_upcoming(self, google_id, video_id, commands_channel):
+        try:
+            upcoming = self._upcoming_video_ids(google_id, video_id)
+            if upcoming:
+                logger.info(f"[PrefetchService] Prefetching {upcoming} for user {google_id}.")
+                details = get_videos_details(upcoming)
+                if commands_channel and self.pubnub_client:
+                    self._send_preload(commands_channel, upcoming[0], details.get(upcoming[0]))
+                self.prefetch(google_id, upcoming)
+        except Exception as e:
+            logger.error(f"[PrefetchService] Error preparing prefetch for user {google_id}: {e}")
+
+    def _send_preload(self, commands_channel, video_id, details):
+        # Lets the device buffer the next track on its standby player for a gapless switch.
+        stream_url = self.stream_service.resolve(video_id)
+        if not stream_url:
+            return
+        self.pubnub_client.publish_message(commands_channel, {
+            "action": "preload",
+            "video_id": video_id,
+            "stream_url": stream_url,
+            "duration": details["duration_seconds"] if details else 0
+        })
+        with self._lock:
+            self.preloads_sent += 1
+
+    def _upcoming_video_ids(self, google_id, video_id):
+        songs = self.user_service.get_favorites_after(google_id, video_id, PREFETCH_DEPTH)
+        return [song["video_id"] for song in songs if song["video_id"] != video_id]
+
+    def prefetch(self, google_id, video_ids):
+        for video_id in video_ids:
+            with self._lock:
+                if video_id in self._inflight_videos:
+                    continue
+                if self._inflight_users.get(google_id, 0) >= PREFETCH_PER_USER_LIMIT:
+                    self.dropped += 1
+                    logger.debug(f"[PrefetchService] Per-user limit reached for {google_id}, dropping {video_id}.")
+                    continue
+                self._inflight_users[google_id] = self._inflight_users.get(google_id, 0) + 1
+                self._inflight_videos.add(video_id)
+                self.scheduled += 1
+            self._executor.submit(self._prefetch_one, google_id, video_id)
+
+    def _prefetch_one(self, google_id, video_id):
+        try:
+            if self.stream_service.resolve(video_id):
+                with self._lock:
+                    self.completed += 1
+            else:
+                with self._lock:
+                    self.failed += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"[PrefetchService] Error prefetching {video_id} for user {google_id}: {e}")
+        finally:
+            with self._lock:
+                self._inflight_videos.discard(video_id)
+                remaining = self._inflight_users.get(google_id, 1) - 1
+                if remaining > 0:
+                    self._inflight_users[google_id] = remaining
+                else:
+                    self._inflight_users.pop(google_id, None)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "preloads_sent": self.preloads_sent,
+                "inflight": len(self._inflight_videos)
+            }
@@ -1,21 +1,214 @@
 from youtube_api import search_youtube_music, autocomplete_music
+from mongodb_client import get_recent_playback_history, iter_favorite_songs, iter_playlist_songs, get_top_tracks
+from cache import TTLCache, MISSING
+from autocomplete_index import AutocompleteIndex
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+SEARCH_CACHE_MAX_SIZE = int(os.getenv("SEARCH_CACHE_MAX_SIZE", "1024"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "600"))
+SEARCH_CACHE_STALE_TTL = int(os.getenv("SEARCH_CACHE_STALE_TTL", "1800"))
+
+AUTOCOMPLETE_INDEX_MAX_TITLES = int(os.getenv("AUTOCOMPLETE_INDEX_MAX_TITLES", "5000"))
+AUTOCOMPLETE_USER_INDEX_MAX_TITLES = int(os.getenv("AUTOCOMPLETE_USER_INDEX_MAX_TITLES", "1000"))
+AUTOCOMPLETE_USER_INDEXES = int(os.getenv("AUTOCOMPLETE_USER_INDEXES", "256"))
+AUTOCOMPLETE_USER_INDEX_TTL = int(os.getenv("AUTOCOMPLETE_USER_INDEX_TTL", "1800"))
+AUTOCOMPLETE_USER_INDEX_RETRY = int(os.getenv("AUTOCOMPLETE_USER_INDEX_RETRY", "30"))
+AUTOCOMPLETE_REMOTE_MIN_CHARS = int(os.getenv("AUTOCOMPLETE_REMOTE_MIN_CHARS", "3"))
+AUTOCOMPLETE_REMOTE_TTL = int(os.getenv("AUTOCOMPLETE_REMOTE_TTL", "300"))
+AUTOCOMPLETE_WARM_HISTORY_LIMIT = int(os.getenv("AUTOCOMPLETE_WARM_HISTORY_LIMIT", "500"))
+AUTOCOMPLETE_WARM_TOP_TRACKS = int(os.getenv("AUTOCOMPLETE_WARM_TOP_TRACKS", "200"))
+AUTOCOMPLETE_PLAY_COUNT_CAP = 10
+
+WEIGHT_SEARCH_RESULT = 1
+WEIGHT_PLAYED = 2
+WEIGHT_PLAYLIST = 2
+WEIGHT_FAVORITE = 3
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
 class SearchService:
+    def __init__(self):
+        self._cache = TTLCache(max_size=SEARCH_CACHE_MAX_SIZE, ttl=SEARCH_CACHE_TTL + SEARCH_CACHE_STALE_TTL)
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-refresh")
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stale_served = 0
+
+        # The shared index only holds titles from search results; favorites, playlists and
+        # history are indexed per user so suggestions never reveal another user's library.
+        self.autocomplete_index = AutocompleteIndex(max_titles=AUTOCOMPLETE_INDEX_MAX_TITLES)
+        self._user_indexes = TTLCache(max_size=AUTOCOMPLETE_USER_INDEXES, ttl=AUTOCOMPLETE_USER_INDEX_TTL)
+        self._user_indexes_building = set()
+        self.user_index_builds = 0
+        self.user_index_failures = 0
+        self._autocomplete_cache = TTLCache(max_size=SEARCH_CACHE_MAX_SIZE, ttl=AUTOCOMPLETE_REMOTE_TTL)
+        self._autocomplete_inflight = {}
+        self.autocomplete_coalesced = 0
+
     def search_youtube_music(self, query, max_results=20, page_token=None):
+        key = (normalize_query(query), page_token or "", max_results)
+        entry = self._cache.get(key)
+        if entry:
+            age = time.monotonic() - entry["fetched_at"]
+            if age > SEARCH_CACHE_TTL:
+                with self._lock:
+                    self.stale_served += 1
+                self._schedule_refresh(key, query, max_results, page_token)
+            logger.info(f"Search results served from cache for query '{query}'.")
+            return entry["results"]
+
+        return self._fetch_and_store(key, query, max_results, page_token)
+
+    def _fetch_and_store(self, key, query, max_results, page_token):
         results = search_youtube_music(query, max_results, page_token)
         if results:
             logger.info(f"Search results fetched for query '{query}'.")
+            self._cache.set(key, {"results": results, "fetched_at": time.monotonic()})
+            for item in results.get("items", []):
+                self.record_title(
+                    item.get("snippet", {}).get("title"),
+                    item.get("id", {}).get("videoId"),
+                    WEIGHT_SEARCH_RESULT
+                )
         else:
             logger.error(f"Failed to fetch search results for query '{query}'.")
         return results
 
-    def autocomplete_music(self, query, max_results=3):
-        suggestions = autocomplete_music(query, max_results)
+    def _schedule_refresh(self, key, query, max_results, page_token):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._refresh_executor.submit(self._refresh, key, query, max_results, page_token)
+
+    def _refresh(self, key, query, max_results, page_token):
+        try:
+            self._fetch_and_store(key, query, max_results, page_token)
+        except Exception as e:
+            logger.error(f"Error revalidating search results for query '{query}': {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def record_title(self, title, video_id, weight=WEIGHT_PLAYED, google_id=None):
+        if google_id is None:
+            self.autocomplete_index.add(title, video_id, weight)
+            return
+        # Users without a loaded index pick the title up from Mongo when it is next built.
+        index = self._user_indexes.get(google_id)
+        if index is not None:
+            index.add(title, video_id, weight)
+
+    def _user_index(self, google_id, playlist_owner_id):
+        with self._lock:
+            index = self._user_indexes.get(google_id)
+            if index is not None:
+                return index
+            # Requests arriving while the index is built get shared suggestions only.
+            if google_id in self._user_indexes_building:
+                return None
+            self._user_indexes_building.add(google_id)
+            self.user_index_builds += 1
+
+        try:
+            index = AutocompleteIndex(max_titles=AUTOCOMPLETE_USER_INDEX_MAX_TITLES)
+            ttl = None
+            try:
+                for doc in get_recent_playback_history(google_id, AUTOCOMPLETE_WARM_HISTORY_LIMIT):
+                    index.add(doc.get("title"), doc.get("video_id"), WEIGHT_PLAYED)
+                if playlist_owner_id:
+                    for song in iter_playlist_songs(playlist_owner_id):
+                        index.add(song.get("title"), song.get("video_id"), WEIGHT_PLAYLIST)
+                for song in iter_favorite_songs(google_id):
+                    index.add(song.get("title"), song.get("video_id"), WEIGHT_FAVORITE)
+                for track in get_top_tracks(google_id, AUTOCOMPLETE_WARM_TOP_TRACKS):
+                    play_count = min(track.get("play_count", 1), AUTOCOMPLETE_PLAY_COUNT_CAP)
+                    index.add(track.get("title"), track.get("video_id"), WEIGHT_PLAYED * play_count)
+                logger.info(f"Autocomplete index for user {google_id} built with {len(index)} titles.")
+            except Exception as e:
+                # Keep what was loaded for a short while instead of rebuilding on every keystroke.
+                logger.error(f"Error building autocomplete index for user {google_id}: {e}")
+                ttl = AUTOCOMPLETE_USER_INDEX_RETRY
+                with self._lock:
+                    self.user_index_failures += 1
+            self._user_indexes.set(google_id, index, ttl)
+            return index
+        finally:
+            with self._lock:
+                self._user_indexes_building.discard(google_id)
+
+    def autocomplete_music(self, query, max_results=3, google_id=None, playlist_owner_id=None):
+        index = self._user_index(google_id, playlist_owner_id) if google_id else None
+        suggestions = index.search(query, max_results) if index is not None else []
+        if len(suggestions) < max_results:
+            titles = {suggestion["title"] for suggestion in suggestions}
+            for suggestion in self.autocomplete_index.search(query, max_results):
+                if suggestion["title"] not in titles and len(suggestions) < max_results:
+                    suggestions.append(suggestion)
+        if suggestions:
+            logger.info(f"Autocomplete suggestions served locally for query '{query}'.")
+            return suggestions
+
+        if len(normalize_query(query)) < AUTOCOMPLETE_REMOTE_MIN_CHARS:
+            return []
+
+        suggestions = self._remote_autocomplete(query, max_results)
         if suggestions:
             logger.info(f"Autocomplete suggestions fetched for query '{query}'.")
         else:
             logger.error(f"Failed to fetch autocomplete suggestions for query '{query}'.")
         return suggestions
+
+    def _remote_autocomplete(self, query, max_results):
+        key = (normalize_query(query), max_results)
+        cached = self._autocomplete_cache.get(key, MISSING)
+        if cached is not MISSING:
+            return cached
+
+        with self._lock:
+            pending = self._autocomplete_inflight.get(key)
+            is_leader = pending is None
+            if is_leader:
+                pending = threading.Event()
+                self._autocomplete_inflight[key] = pending
+            else:
+                self.autocomplete_coalesced += 1
+
+        if not is_leader:
+            pending.wait(10)
+            return self._autocomplete_cache.get(key, [])
+
+        try:
+            suggestions = autocomplete_music(query, max_results)
+            # Errors also come back empty; only real suggestions are cached so a failure is retried.
+            if suggestions:
+                self._autocomplete_cache.set(key, suggestions)
+            for suggestion in suggestions:
+                self.record_title(suggestion["title"], suggestion["video_id"], WEIGHT_SEARCH_RESULT)
+            return suggestions
+        finally:
+            with self._lock:
+                self._autocomplete_inflight.pop(key, None)
+            pending.set()
+
+    def stats(self):
+        stats = self._cache.stats()
+        with self._lock:
+            stats["stale_served"] = self.stale_served
+            stats["refreshing"] = len(self._refreshing)
+            stats["autocomplete"] = dict(
+                self.autocomplete_index.stats(),
+                user_indexes=self._user_indexes.stats(),
+                user_index_builds=self.user_index_builds,
+                user_index_failures=self.user_index_failures,
+                remote_cache=self._autocomplete_cache.stats(),
+                coalesced=self.autocomplete_coalesced
+            )
+        return stats
@@ -0,0 +1,114 @@
+import os
+import re
+import time
+import threading
+import logging
+
+from cache import TTLCache
+from youtube_api import get_direct_stream_url
+
+logger = logging.getLogger(__name__)
+
+STREAM_CACHE_MAX_SIZE = int(os.getenv("STREAM_CACHE_MAX_SIZE", "512"))
+STREAM_URL_SAFETY_MARGIN = int(os.getenv("STREAM_URL_SAFETY_MARGIN", "300"))
+STREAM_URL_DEFAULT_TTL = int(os.getenv("STREAM_URL_DEFAULT_TTL", "3600"))
+STREAM_URL_REFRESH_WINDOW = int(os.getenv("STREAM_URL_REFRESH_WINDOW", "900"))
+STREAM_URL_REFRESH_INTERVAL = int(os.getenv("STREAM_URL_REFRESH_INTERVAL", "60"))
+STREAM_URL_REFRESH_IDLE = int(os.getenv("STREAM_URL_REFRESH_IDLE", "3600"))
+
+EXPIRE_PATTERN = re.compile(r"[?&/]expire[=/](\d+)")
+
+def parse_stream_expiry(stream_url):
+    if not stream_url:
+        return None
+    match = EXPIRE_PATTERN.search(stream_url)
+    if not match:
+        return None
+    return int(match.group(1))
+
+class StreamService:
+    def __init__(self):
+        self._cache = TTLCache(max_size=STREAM_CACHE_MAX_SIZE, ttl=STREAM_URL_DEFAULT_TTL)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.refreshes = 0
+
+    def is_url_valid(self, stream_url):
+        if not stream_url:
+            return False
+        expire = parse_stream_expiry(stream_url)
+        if expire is None:
+            return False
+        return expire - STREAM_URL_SAFETY_MARGIN > time.time()
+
+    def get_cached_stream_url(self, video_id):
+        entry = self._cache.get(video_id)
+        if not entry:
+            return None
+        entry["last_used"] = time.time()
+        return entry["url"]
+
+    def resolve(self, video_id, current_url=None):
+        if not video_id:
+            return ""
+
+        if self.is_url_valid(current_url):
+            return current_url
+
+        cached_url = self.get_cached_stream_url(video_id)
+        if cached_url:
+            return cached_url
+
+        return self._resolve_and_store(video_id, time.time())
+
+    def _resolve_and_store(self, video_id, last_used):
+        stream_url = get_direct_stream_url(video_id)
+        if not stream_url:
+            return ""
+
+        expire = parse_stream_expiry(stream_url)
+        if expire is None:
+            ttl = STREAM_URL_DEFAULT_TTL
+        else:
+            ttl = expire - STREAM_URL_SAFETY_MARGIN - time.time()
+
+        if ttl > 0:
+            self._cache.set(video_id, {"url": stream_url, "last_used": last_used}, ttl)
+            logger.info(f"[StreamService] Cached stream URL for {video_id} for {int(ttl)}s.")
+        return stream_url
+
+    def invalidate(self, video_id):
+        self._cache.delete(video_id)
+
+    def refresh_expiring(self):
+        idle_cutoff = time.time() - STREAM_URL_REFRESH_IDLE
+        for video_id, entry in self._cache.expiring_within(STREAM_URL_REFRESH_WINDOW):
+            if entry["last_used"] < idle_cutoff:
+                continue
+            try:
+                if self._resolve_and_store(video_id, entry["last_used"]):
+                    self.refreshes += 1
+                    logger.info(f"[StreamService] Refreshed stream URL for {video_id} before expiry.")
+            except Exception as e:
+                logger.error(f"[StreamService] Error refreshing stream URL for {video_id}: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(STREAM_URL_REFRESH_INTERVAL):
+            self.refresh_expiring()
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats["refreshes"] = self.refreshes
+        return stats
@@ -0,0 +1,129 @@
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+from mongodb_client import find_users_with_expiring_tokens, update_users_tokens
+
+logger = logging.getLogger(__name__)
+
+TOKEN_TTL = int(os.getenv("PUBNUB_TOKEN_TTL", "3600"))
+TOKEN_RENEWAL_WINDOW = int(os.getenv("TOKEN_RENEWAL_WINDOW", "900"))
+TOKEN_RENEWAL_INTERVAL = int(os.getenv("TOKEN_RENEWAL_INTERVAL", "300"))
+TOKEN_RENEWAL_BATCH_SIZE = int(os.getenv("TOKEN_RENEWAL_BATCH_SIZE", "50"))
+TOKEN_RENEWAL_WORKERS = int(os.getenv("TOKEN_RENEWAL_WORKERS", "4"))
+
+TOKEN_FIELDS = [
+    ("channel_name_commands", "channel_token_commands", "channel_token_commands_expiration"),
+    ("channel_name_status", "channel_token_status", "channel_token_status_expiration"),
+]
+
+class TokenRenewalService:
+    def __init__(self, user_service, pubnub_client):
+        self.user_service = user_service
+        self.pubnub_client = pubnub_client
+        self._executor = ThreadPoolExecutor(max_workers=TOKEN_RENEWAL_WORKERS, thread_name_prefix="token-renewal")
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.renewed = 0
+        self.failed = 0
+        self.scans = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _loop(self):
+        while True:
+            try:
+                self.renew_expiring()
+            except Exception as e:
+                logger.error(f"[TokenRenewalService] Error during token renewal scan: {e}")
+            if self._stop_event.wait(TOKEN_RENEWAL_INTERVAL):
+                return
+
+    def renew_expiring(self):
+        before = datetime.now(timezone.utc) + timedelta(seconds=TOKEN_RENEWAL_WINDOW)
+        batch = []
+        for user_doc in find_users_with_expiring_tokens(before):
+            batch.append(user_doc)
+            if len(batch) >= TOKEN_RENEWAL_BATCH_SIZE:
+                self._submit_batch(batch, before)
+                batch = []
+        if batch:
+            self._submit_batch(batch, before)
+        with self._lock:
+            self.scans += 1
+
+    def request_renewal(self, user_doc):
+        before = datetime.now(timezone.utc) + timedelta(seconds=TOKEN_RENEWAL_WINDOW)
+        self._submit_batch([user_doc], before)
+
+    def _submit_batch(self, user_docs, before):
+        with self._lock:
+            user_docs = [doc for doc in user_docs if doc["google_id"] not in self._pending]
+            self._pending.update(doc["google_id"] for doc in user_docs)
+        if user_docs:
+            self._executor.submit(self._renew_batch, user_docs, before)
+
+    def _renew_batch(self, user_docs, before):
+        updates = {}
+        try:
+            for user_doc in user_docs:
+                google_id = user_doc["google_id"]
+                fields = {}
+                for channel_field, token_field, expiration_field in TOKEN_FIELDS:
+                    expiration = user_doc.get(expiration_field)
+                    channel = user_doc.get(channel_field)
+                    if not channel or not expiration:
+                        continue
+                    if expiration.tzinfo is None:
+                        expiration = expiration.replace(tzinfo=timezone.utc)
+                    if expiration >= before:
+                        continue
+                    token, new_expiration = self.pubnub_client.generate_token([channel], ttl=TOKEN_TTL)
+                    if token:
+                        fields[token_field] = token
+                        fields[expiration_field] = new_expiration
+                    else:
+                        logger.error(f"[TokenRenewalService] Failed to renew {token_field} for user {google_id}.")
+                        with self._lock:
+                            self.failed += 1
+                if fields:
+                    updates[google_id] = fields
+
+            if updates:
+                update_users_tokens(updates)
+                for google_id in updates:
+                    self.user_service.invalidate_user(google_id)
+                with self._lock:
+                    self.renewed += len(updates)
+                logger.info(f"[TokenRenewalService] Renewed tokens for {len(updates)} users.")
+        except Exception as e:
+            logger.error(f"[TokenRenewalService] Error renewing token batch: {e}")
+            with self._lock:
+                self.failed += len(user_docs)
+        finally:
+            with self._lock:
+                self._pending.difference_update(doc["google_id"] for doc in user_docs)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "scans": self.scans,
+                "renewed": self.renewed,
+                "failed": self.failed,
+                "pending": len(self._pending)
+            }
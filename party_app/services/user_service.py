@@ -2,84 +2,112 @@ from mongodb_client import (
     get_user_by_google_id,
     save_user,
     save_preferences,
-    get_preferences,
-    log_playback_history,
     update_user_token,
     get_all_users,
     create_playlist,
     update_playlist,
+    insert_playlist_songs,
+    remove_playlist_song,
+    move_playlist_song,
+    get_playlist_version,
     get_playlists,
+    get_playlist_summaries,
+    get_playlist_songs,
     delete_playlist,
     add_favorite,
     remove_favorite,
-    create_favorites,
-    get_favorites,
+    is_favorite,
+    get_favorites_page,
+    get_favorites_after,
+    get_top_tracks,
+    get_daily_play_counts,
     create_category,
     add_playlist_to_category,
-    get_categories,
-    get_current_playback,
-    update_current_playback
+    get_categories
 )
+from flask import g, has_app_context
+from cache import TTLCache
+from services.playback_state_store import PlaybackStateStore
+from services.playback_history_writer import PlaybackHistoryWriter
+import copy
+import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "4096"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+
 class UserService:
     def __init__(self, pubnub_client):
         self.pubnub_client = pubnub_client
+        self._user_cache = TTLCache(max_size=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL)
+        self.playback_state = PlaybackStateStore()
+        self.history_writer = PlaybackHistoryWriter()
+
+    def _request_users(self):
+        if not has_app_context():
+            return None
+        if "user_docs" not in g:
+            g.user_docs = {}
+        return g.user_docs
 
     def get_user_by_google_id(self, google_id):
-        return get_user_by_google_id(google_id)
+        request_users = self._request_users()
+        if request_users is not None and google_id in request_users:
+            return request_users[google_id]
+
+        user_doc = self._user_cache.get(google_id)
+        if user_doc is not None:
+            user_doc = copy.deepcopy(user_doc)
+        else:
+            user_doc = get_user_by_google_id(google_id)
+            if user_doc is not None:
+                self._user_cache.set(google_id, copy.deepcopy(user_doc))
+
+        if request_users is not None and user_doc is not None:
+            request_users[google_id] = user_doc
+        return user_doc
+
+    def invalidate_user(self, google_id):
+        self._user_cache.delete(google_id)
+        request_users = self._request_users()
+        if request_users is not None:
+            request_users.pop(google_id, None)
 
     def save_user(self, user_doc):
         save_user(user_doc)
+        self.invalidate_user(user_doc["google_id"])
 
     def save_preferences(self, google_id, preferences):
         save_preferences(google_id, preferences)
+        self.invalidate_user(google_id)
 
     def get_preferences(self, google_id):
-        return get_preferences(google_id)
+        user_doc = self.get_user_by_google_id(google_id)
+        return user_doc.get("preferences") if user_doc else None
 
     def log_playback_history(self, google_id, video_id, title):
-        log_playback_history(google_id, video_id, title)
+        self.history_writer.record(google_id, video_id, title)
+
+    def get_top_tracks(self, google_id, limit):
+        return get_top_tracks(google_id, limit)
+
+    def get_daily_play_counts(self, google_id, since):
+        return get_daily_play_counts(google_id, since)
 
     def update_user_tokens(self, google_id, new_tokens):
         update_user_token(google_id, new_tokens)
+        self.invalidate_user(google_id)
 
-    def update_tokens_if_expired(self, google_id, user_doc):
-        tokens_updated = False
+    def has_expired_tokens(self, user_doc):
         if user_doc is None:
-            return tokens_updated
-
-        expiration_commands = user_doc.get("channel_token_commands_expiration")
-        if expiration_commands and self.pubnub_client.is_token_expired(expiration_commands):
-            new_cmd_token, new_cmd_exp = self.pubnub_client.generate_token([user_doc["channel_name_commands"]])
-            if new_cmd_token:
-                self.update_user_tokens(google_id, {
-                    "channel_token_commands": new_cmd_token,
-                    "channel_token_commands_expiration": new_cmd_exp
-                })
-                tokens_updated = True
-                logger.info(f"Updated channel_token_commands for user {google_id}")
-            else:
-                logger.error("Failed to update channel_token_commands.")
-                return False
-
-        expiration_status = user_doc.get("channel_token_status_expiration")
-        if expiration_status and self.pubnub_client.is_token_expired(expiration_status):
-            new_st_token, new_st_exp = self.pubnub_client.generate_token([user_doc["channel_name_status"]])
-            if new_st_token:
-                self.update_user_tokens(google_id, {
-                    "channel_token_status": new_st_token,
-                    "channel_token_status_expiration": new_st_exp
-                })
-                tokens_updated = True
-                logger.info(f"Updated channel_token_status for user {google_id}")
-            else:
-                logger.error("Failed to update channel_token_status.")
-                return False
-
-        return tokens_updated
+            return False
+        for field in ["channel_token_commands_expiration", "channel_token_status_expiration"]:
+            expiration = user_doc.get(field)
+            if expiration and self.pubnub_client.is_token_expired(expiration):
+                return True
+        return False
 
     def get_all_users(self):
         return get_all_users()
@@ -89,13 +117,33 @@ class UserService:
         logger.info(f"Created playlist '{name}' with ID {pid} for user {google_id}.")
         return pid
 
-    def update_playlist(self, playlist_id, update_data):
-        update_playlist(playlist_id, update_data)
-        logger.info(f"Updated playlist {playlist_id} with data {update_data}.")
+    def update_playlist(self, google_id, playlist_id, update_data, expected_version=None):
+        result = update_playlist(google_id, playlist_id, update_data, expected_version)
+        if result:
+            logger.info(f"Updated playlist {playlist_id} to version {result['version']} with fields {list(update_data)}.")
+        return result
+
+    def insert_playlist_songs(self, google_id, playlist_id, songs, position=None, expected_version=None):
+        return insert_playlist_songs(google_id, playlist_id, songs, position, expected_version)
+
+    def remove_playlist_song(self, google_id, playlist_id, video_id, expected_version=None):
+        return remove_playlist_song(google_id, playlist_id, video_id, expected_version)
+
+    def move_playlist_song(self, google_id, playlist_id, video_id, position, expected_version=None):
+        return move_playlist_song(google_id, playlist_id, video_id, position, expected_version)
+
+    def get_playlist_version(self, google_id, playlist_id):
+        return get_playlist_version(google_id, playlist_id)
 
     def get_playlists(self, google_id):
         return get_playlists(google_id)
 
+    def get_playlist_summaries(self, google_id, limit, after=None):
+        return get_playlist_summaries(google_id, limit, after)
+
+    def get_playlist_songs(self, google_id, playlist_id, offset, limit):
+        return get_playlist_songs(google_id, playlist_id, offset, limit)
+
     def delete_playlist(self, google_id, playlist_id):
         success = delete_playlist(google_id, playlist_id)
         if success:
@@ -104,21 +152,26 @@ class UserService:
             logger.warning(f"Failed to delete playlist {playlist_id} for user {google_id}.")
         return success
 
-    def create_favorites(self, google_id):
-        fid = create_favorites(google_id)
-        logger.info(f"Created favorites with ID {fid} for user {google_id}.")
-        return fid
-
     def add_favorite(self, google_id, song):
-        add_favorite(google_id, song)
-        logger.info(f"Added song {song['video_id']} to favorites for user {google_id}.")
+        added = add_favorite(google_id, song)
+        if added:
+            logger.info(f"Added song {song['video_id']} to favorites for user {google_id}.")
+        return added
 
     def remove_favorite(self, google_id, video_id):
-        remove_favorite(google_id, video_id)
-        logger.info(f"Removed song {video_id} from favorites for user {google_id}.")
+        removed = remove_favorite(google_id, video_id)
+        if removed:
+            logger.info(f"Removed song {video_id} from favorites for user {google_id}.")
+        return removed
 
-    def get_favorites(self, google_id):
-        return get_favorites(google_id)
+    def is_favorite(self, google_id, video_id):
+        return is_favorite(google_id, video_id)
+
+    def get_favorites_page(self, google_id, limit, after=None):
+        return get_favorites_page(google_id, limit, after)
+
+    def get_favorites_after(self, google_id, video_id, limit):
+        return get_favorites_after(google_id, video_id, limit)
 
     def create_category(self, google_id, name, description=""):
         create_category(google_id, name, description)
@@ -132,9 +185,15 @@ class UserService:
         return get_categories(google_id)
 
     def get_current_playback(self, google_id):
-        return get_current_playback(google_id)
+        return self.playback_state.get(google_id)
 
     def update_current_playback(self, google_id, current_song):
         logger.info(f"[UserService] update_current_playback called. user={google_id}, new current_song={current_song}")
-        update_current_playback(google_id, current_song)
-        logger.info(f"[UserService] Completed update_current_playback for user={google_id}")
\ No newline at end of file
+        self.playback_state.put(google_id, current_song)
+        logger.info(f"[UserService] Completed update_current_playback for user={google_id}")
+
+    def record_status_playback(self, google_id, current_song):
+        self.playback_state.put(google_id, current_song, persist=False)
+
+    def stats(self):
+        return self._user_cache.stats()
@@ -2,12 +2,10 @@ import { API } from './api.js';
 import { playSongFromFavorites } from './playback/playbackActions.js';
 
 export function toggleFavorite(video_id) {
-  fetch(API.FAVORITES)
+  fetch(`${API.FAVORITES}/${video_id}`)
     .then(res => res.json())
     .then(data => {
-      const { favorites } = data;
-      const isInFav = favorites.some(s => s.video_id === video_id);
-      if (isInFav) {
+      if (data.favorite) {
         removeFavorite(video_id);
       } else {
         addFavorite(video_id);
@@ -44,48 +42,87 @@ export function removeFavorite(video_id) {
     .catch(err => console.error("Error deleting from favorites:", err));
 }
 
+export function setupFavoritesList() {
+  // The first page is rendered by the server; wire it up instead of fetching it again.
+  const favList = document.getElementById("favorites-list");
+  if (!favList) return;
+  favList.querySelectorAll(".favorite-item").forEach(li => {
+    bindFavoriteItem(li, {
+      video_id: li.dataset.videoId,
+      title: li.dataset.title,
+      thumbnail_url: li.dataset.thumbnail,
+      duration: Number(li.dataset.duration) || 0
+    });
+  });
+  const moreBtn = document.getElementById("favorites-load-more");
+  if (moreBtn) {
+    moreBtn.addEventListener("click", () => loadFavoritesPage(favList, moreBtn.dataset.cursor));
+  }
+}
+
 export function refreshFavoritesList() {
-  fetch(API.FAVORITES)
-    .then(r => r.json())
-    .then(data => {
-      const favorites = data.favorites || [];
-      const favList = document.getElementById("favorites-list");
-      if (!favList) return;
-      favList.innerHTML = "";
-      favorites.forEach(song => {
-        const li = document.createElement("li");
-        li.className = "favorite-item";
-        li.dataset.videoId = song.video_id;
-        li.dataset.title = song.title;
-        li.dataset.thumbnail = song.thumbnail_url || "";
-        li.dataset.duration = song.duration || 0;
+  const favList = document.getElementById("favorites-list");
+  if (!favList) return;
+  favList.innerHTML = "";
+  loadFavoritesPage(favList, null);
+}
+
+function bindFavoriteItem(li, song) {
+  li.querySelector(".trash-btn").addEventListener("click", () => removeFavorite(song.video_id));
+  li.querySelector(".play-btn").addEventListener("click", () => {
+    playSongFromFavorites({
+      video_id: song.video_id,
+      title: song.title,
+      thumbnail_url: song.thumbnail_url,
+      duration: song.duration
+    });
+  });
+}
+
+function createFavoriteItem(song) {
+  const li = document.createElement("li");
+  li.className = "favorite-item";
+  li.dataset.videoId = song.video_id;
+  li.dataset.title = song.title;
+  li.dataset.thumbnail = song.thumbnail_url || "";
+  li.dataset.duration = song.duration || 0;
 
-        const spanTitle = document.createElement("span");
-        spanTitle.className = "song-title";
-        spanTitle.textContent = song.title;
+  const spanTitle = document.createElement("span");
+  spanTitle.className = "song-title";
+  spanTitle.textContent = song.title;
 
-        const trashBtn = document.createElement("button");
-        trashBtn.className = "trash-btn";
-        trashBtn.textContent = "🗑️";
-        trashBtn.addEventListener("click", () => removeFavorite(song.video_id));
+  const trashBtn = document.createElement("button");
+  trashBtn.className = "trash-btn";
+  trashBtn.textContent = "🗑️";
 
-        const playBtn = document.createElement("button");
-        playBtn.className = "play-btn";
-        playBtn.textContent = "Play";
-        playBtn.addEventListener("click", () => {
-          playSongFromFavorites({
-            video_id: song.video_id,
-            title: song.title,
-            thumbnail_url: song.thumbnail_url,
-            duration: song.duration
-          });
-        });
+  const playBtn = document.createElement("button");
+  playBtn.className = "play-btn";
+  playBtn.textContent = "Play";
 
-        li.appendChild(spanTitle);
-        li.appendChild(trashBtn);
-        li.appendChild(playBtn);
-        favList.appendChild(li);
-      });
+  li.appendChild(spanTitle);
+  li.appendChild(trashBtn);
+  li.appendChild(playBtn);
+  bindFavoriteItem(li, song);
+  return li;
+}
+
+function loadFavoritesPage(favList, cursor) {
+  const url = cursor ? `${API.FAVORITES}?cursor=${encodeURIComponent(cursor)}` : API.FAVORITES;
+  fetch(url)
+    .then(r => r.json())
+    .then(data => {
+      const favorites = data.favorites || [];
+      const oldMoreBtn = document.getElementById("favorites-load-more");
+      if (oldMoreBtn) oldMoreBtn.remove();
+      favorites.forEach(song => favList.appendChild(createFavoriteItem(song)));
+
+      if (data.next_cursor) {
+        const moreBtn = document.createElement("button");
+        moreBtn.id = "favorites-load-more";
+        moreBtn.textContent = "Load more";
+        moreBtn.addEventListener("click", () => loadFavoritesPage(favList, data.next_cursor));
+        favList.after(moreBtn);
+      }
     })
     .catch(err => console.error("Error updating favorites list:", err));
-}
\ No newline at end of file
+}
@@ -1,11 +1,10 @@
   import { API } from './api.js';
 
   export function checkIfFavorite(video_id) {
-    fetch(API.FAVORITES)
+    fetch(`${API.FAVORITES}/${video_id}`)
       .then(res => res.json())
       .then(data => {
-        const { favorites } = data;
-        const isInFav = favorites.some(s => s.video_id === video_id);
+        const isInFav = Boolean(data.favorite);
         const heartBtn = document.getElementById("current-heart-btn");
         if (heartBtn) {
           heartBtn.textContent = isInFav ? "♥" : "♡";
@@ -23,8 +23,8 @@ document.addEventListener("DOMContentLoaded", async () => {
       initProfileDropdownToggle()
     ),
     import("./favorites.js").then(
-      ({ refreshFavoritesList, toggleFavorite }) => {
-        refreshFavoritesList();
+      ({ setupFavoritesList, toggleFavorite }) => {
+        setupFavoritesList();
         const currentHeartBtn = document.getElementById("current-heart-btn");
         if (currentHeartBtn) {
           currentHeartBtn.addEventListener("click", () => {
@@ -16,6 +16,12 @@ import {
   hideLoadingState
 } from "./playbackUI.js";
 
+function refreshUnlessQueued(res) {
+  // 202 => the command runs as a background job; its result arrives via "playback_update".
+  if (res && res.status === 202) return Promise.resolve();
+  return fetchCurrentPlayback();
+}
+
 function pauseIfPlaying() {
   if (getCurrentPlayingState() !== "playing") return Promise.resolve();
   showLoadingState();
@@ -31,9 +37,9 @@ function pauseIfPlaying() {
       position: pos,
       timestamp: nowTs
     })
-  }).then(() => {
+  }).then(res => {
     hideLoadingState();
-    return fetchCurrentPlayback();
+    return refreshUnlessQueued(res);
   });
 }
 
@@ -60,9 +66,9 @@ export function sendPauseCommand() {
       position: pos,
       timestamp: nowTs
     })
-  }).then(() => {
+  }).then(res => {
     hideLoadingState();
-    fetchCurrentPlayback();
+    refreshUnlessQueued(res);
   });
 }
 
@@ -77,8 +83,8 @@ export function sendSeekCommand(newPos) {
       position: newPos,
       timestamp: nowTs
     })
-  }).then(() => {
-    fetchCurrentPlayback();
+  }).then(res => {
+    refreshUnlessQueued(res);
   });
 }
 
@@ -97,9 +103,9 @@ export function sendResumeAsPlay() {
       position: pos,
       timestamp: nowTs
     })
-  }).then(() => {
+  }).then(res => {
     hideLoadingState();
-    fetchCurrentPlayback();
+    refreshUnlessQueued(res);
   });
 }
 
@@ -129,9 +135,9 @@ export function playSongFromSearch(songData) {
         mode: "default",
         timestamp: nowTs
       })
-    }).then(() => {
+    }).then(res => {
       hideLoadingState();
-      fetchCurrentPlayback();
+      refreshUnlessQueued(res);
     });
   });
 }
@@ -160,11 +166,12 @@ export function playSongFromFavorites(songData) {
         thumbnail_url: songData.thumbnail_url,
         position: 0,
         mode: "default",
+        source: "favorites",
         timestamp: nowTs
       })
-    }).then(() => {
+    }).then(res => {
       hideLoadingState();
-      fetchCurrentPlayback();
+      refreshUnlessQueued(res);
     });
   });
 }
@@ -205,9 +212,9 @@ export function playSongFromCurrent(startPos = 0) {
         mode: "default",
         timestamp: Date.now()
       })
-    }).then(() => {
+    }).then(res => {
       hideLoadingState();
-      fetchCurrentPlayback();
+      refreshUnlessQueued(res);
     });
   });
 }
@@ -4,9 +4,17 @@ let currentDuration = 0;
 let currentVideoId = null;
 let playbackTimer = null;
 let confirmationTimeout = null;
+let clockAnchor = { position: 0, rate: 0, at: Date.now() };
+
+// Position is interpolated from the last anchor instead of being counted up every tick.
+function reanchor(rate) {
+  clockAnchor = { position: currentPosition, rate, at: Date.now() };
+}
 
 export function setCurrentPlayingState(state) {
+  currentPosition = getCurrentPosition();
   currentPlayingState = state;
+  reanchor(state === "playing" ? 1 : 0);
 }
 
 export function getCurrentPlayingState() {
@@ -15,10 +23,18 @@ export function getCurrentPlayingState() {
 
 export function setCurrentPosition(pos) {
   currentPosition = pos;
+  reanchor(currentPlayingState === "playing" ? 1 : 0);
 }
 
 export function getCurrentPosition() {
-  return currentPosition;
+  const elapsed = (Date.now() - clockAnchor.at) / 1000;
+  const pos = clockAnchor.position + elapsed * clockAnchor.rate;
+  return currentDuration > 0 ? Math.min(pos, currentDuration) : pos;
+}
+
+export function setPlaybackClock(position, rate) {
+  currentPosition = position;
+  clockAnchor = { position, rate, at: Date.now() };
 }
 
 export function setCurrentDuration(dur) {
@@ -1,6 +1,5 @@
 import {
   getCurrentPosition,
-  setCurrentPosition,
   getCurrentPlayingState,
   setCurrentPlayingState,
   getCurrentDuration,
@@ -20,8 +19,7 @@ export function startPlaybackTimer() {
   const mainTimer = setInterval(() => {
     const st = getCurrentPlayingState();
     if (st === "playing") {
-      const newPos = getCurrentPosition() + 1;
-      setCurrentPosition(newPos);
+      const newPos = getCurrentPosition();
       const slider = document.getElementById("playback-progress");
       if (slider) slider.value = newPos;
       const progStart = document.getElementById("prog-start");
@@ -45,7 +43,7 @@ export function startPlaybackTimer() {
         });
       }
     }
-  }, 1000);
+  }, 500);
   setPlaybackTimer(mainTimer);
   positionUpdateIntervalId = setInterval(() => {
     const st = getCurrentPlayingState();
@@ -1,13 +1,52 @@
 import { updatePlaybackUI } from "./playbackUI.js";
-import { getConfirmationTimeout, setConfirmationTimeout } from "./playbackState.js";
+import { getConfirmationTimeout, setConfirmationTimeout, setPlaybackClock } from "./playbackState.js";
 import { fetchCurrentPlayback } from "./initPlayback.js";
 
+let serverSong = null;
+let lastServerTs = 0;
+
+function applyPlaybackEvent(data) {
+  if (data.clock && data.clock.server_ts < lastServerTs) return null;
+
+  if (data.type === "delta") {
+    if (!serverSong) {
+      fetchCurrentPlayback();
+      return null;
+    }
+    serverSong = { ...serverSong, ...data.changes };
+  } else if (data.current_song) {
+    serverSong = { ...data.current_song };
+  } else {
+    return null;
+  }
+
+  if (data.clock) {
+    lastServerTs = data.clock.server_ts;
+    serverSong.position = data.clock.position;
+  }
+  return serverSong;
+}
+
 export function setupPlaybackUpdateListener(socket) {
   socket.on("connect", () => {});
-  socket.on("disconnect", () => {});
+  socket.on("disconnect", () => {
+    serverSong = null;
+    lastServerTs = 0;
+  });
   socket.on("playback_update", (data) => {
-    updatePlaybackUI(data);
-    if (data.current_song && data.current_song.state === "pause" && getConfirmationTimeout()) {
+    if (data.status === "failed") {
+      console.error(`Playback job ${data.job_id} failed:`, data.error);
+      fetchCurrentPlayback();
+      return;
+    }
+    const song = applyPlaybackEvent(data);
+    if (!song) return;
+
+    updatePlaybackUI({ current_song: song });
+    if (data.clock) {
+      setPlaybackClock(data.clock.position, data.clock.rate);
+    }
+    if (song.state === "pause" && getConfirmationTimeout()) {
       clearTimeout(getConfirmationTimeout());
       setConfirmationTimeout(null);
     }
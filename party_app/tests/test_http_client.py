@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_client import (
+    CircuitBreaker, CircuitOpenError, HttpClient, LatencyHistogram, RetryableStatusError
+)
+
+class StubServer:
+    # Serves scripted (status, delay) responses in order; the last one repeats.
+    def __init__(self):
+        self.responses = [(200, 0)]
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                index = min(len(stub.requests), len(stub.responses)) - 1
+                status, delay = stub.responses[index]
+                time.sleep(delay)
+                body = json.dumps({"status": status, "path": self.path}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    server.start()
+    yield server
+    server.stop()
+
+def make_client(stub, **kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    return HttpClient(stub.url, **kwargs)
+
+def test_returns_json_on_success(stub):
+    client = make_client(stub)
+    assert client.get("videos", params={"id": "abc"}) == {"status": 200, "path": "/videos?id=abc"}
+    stats = client.stats()["videos"]
+    assert stats["requests"] == 1
+    assert stats["retries"] == 0
+    assert stats["state"] == "closed"
+
+def test_retries_retryable_status_then_succeeds(stub):
+    stub.responses = [(503, 0), (429, 0), (200, 0)]
+    client = make_client(stub, max_retries=2)
+    assert client.get("search")["status"] == 200
+    stats = client.stats()["search"]
+    assert len(stub.requests) == 3
+    assert stats["retries"] == 2
+    assert stats["failures"] == 0
+
+def test_raises_after_retries_exhausted(stub):
+    stub.responses = [(500, 0)]
+    client = make_client(stub, max_retries=2)
+    with pytest.raises(RetryableStatusError):
+        client.get("search")
+    assert len(stub.requests) == 3
+    assert client.stats()["search"]["failures"] == 1
+
+def test_client_error_is_not_retried(stub):
+    stub.responses = [(404, 0)]
+    client = make_client(stub, max_retries=2, breaker_threshold=1)
+    with pytest.raises(requests.HTTPError):
+        client.get("videos")
+    assert len(stub.requests) == 1
+    assert client.stats()["videos"]["state"] == "closed"
+
+def test_backoff_grows_with_each_retry(stub, monkeypatch):
+    stub.responses = [(502, 0), (502, 0), (200, 0)]
+    client = make_client(stub, max_retries=2, backoff_base=0.01)
+    attempts = []
+    backoff = client._backoff
+    monkeypatch.setattr(client, "_backoff", lambda attempt: attempts.append(attempt) or backoff(attempt))
+    client.get("search")
+    assert attempts == [1, 2]
+
+def test_backoff_is_bounded_full_jitter():
+    client = HttpClient("http://127.0.0.1", backoff_base=0.1)
+    for attempt in range(1, 5):
+        delays = [client._backoff(attempt) for _ in range(200)]
+        assert all(0 <= delay <= 0.1 * 2 ** attempt for delay in delays)
+
+def test_timeout_is_retried_and_raised(stub):
+    stub.responses = [(200, 0.5)]
+    client = make_client(stub, timeouts={"slow": 0.1}, max_retries=1)
+    started = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        client.get("slow")
+    assert time.monotonic() - started < 0.5 * 2
+    stats = client.stats()["slow"]
+    assert stats["requests"] == 2
+    assert stats["failures"] == 1
+    assert stats["latency"]["count"] == 2
+
+def test_timeout_recovers_on_retry(stub):
+    stub.responses = [(200, 0.5), (200, 0)]
+    client = make_client(stub, timeouts={"slow": 0.1}, max_retries=1)
+    assert client.get("slow")["status"] == 200
+
+def test_breaker_opens_half_opens_and_closes(stub):
+    stub.responses = [(500, 0), (500, 0), (200, 0)]
+    client = make_client(stub, max_retries=0, breaker_threshold=2, breaker_reset=0.2)
+
+    for _ in range(2):
+        with pytest.raises(RetryableStatusError):
+            client.get("videos")
+    assert client.stats()["videos"]["state"] == "open"
+
+    with pytest.raises(CircuitOpenError):
+        client.get("videos")
+    assert len(stub.requests) == 2
+    assert client.stats()["videos"]["rejected"] == 1
+
+    time.sleep(0.25)
+    assert client.stats()["videos"]["state"] == "half_open"
+    assert client.get("videos")["status"] == 200
+    assert client.stats()["videos"]["state"] == "closed"
+
+def test_failed_probe_reopens_breaker(stub):
+    stub.responses = [(500, 0)]
+    client = make_client(stub, max_retries=0, breaker_threshold=1, breaker_reset=0.2)
+    with pytest.raises(RetryableStatusError):
+        client.get("videos")
+    time.sleep(0.25)
+    assert client.stats()["videos"]["state"] == "half_open"
+    with pytest.raises(RetryableStatusError):
+        client.get("videos")
+    assert client.stats()["videos"]["state"] == "open"
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow_request()
+
+def test_latency_histogram_buckets():
+    histogram = LatencyHistogram(buckets_ms=[10, 100])
+    for seconds in (0.005, 0.010, 0.050, 0.5):
+        histogram.observe(seconds)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["buckets"] == {"le_10ms": 2, "le_100ms": 1, "gt_100ms": 1}
+    assert snapshot["avg_ms"] == pytest.approx((5 + 10 + 50 + 500) / 4)
+
+def test_latency_histogram_records_each_attempt(stub):
+    stub.responses = [(503, 0.05), (200, 0)]
+    client = make_client(stub, max_retries=1)
+    client.get("search")
+    latency = client.stats()["search"]["latency"]
+    assert latency["count"] == 2
+    assert sum(latency["buckets"].values()) == 2
+    assert latency["buckets"]["le_25ms"] == 1
+    assert latency["avg_ms"] > 25
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import mongodb_client
+
+GOOGLE_ID = "google-123"
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock.MongoClient().db
+    for name in [
+        "users", "playlists", "favorites", "favorite_songs", "categories", "current_playback",
+        "playback_history", "playback_history_buckets", "track_stats", "video_metadata"
+    ]:
+        monkeypatch.setattr(mongodb_client, f"{name}_collection", database[name])
+    return database
+
+class FakeDatabase:
+    # create_indexes only goes through `db` for collMod, which mongomock does not implement.
+    def __init__(self):
+        self.commands = []
+
+    def command(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+
+def test_legacy_history_has_no_ttl(db, monkeypatch):
+    monkeypatch.setattr(mongodb_client, "db", FakeDatabase())
+    db.playback_history.create_index("played_at", expireAfterSeconds=86400)
+    db.playback_history_buckets.create_index("expires_at", expireAfterSeconds=0)
+
+    mongodb_client.create_indexes()
+
+    assert "played_at_1" not in db.playback_history.index_information()
+    bucket_indexes = db.playback_history_buckets.index_information()
+    assert "expires_at_1" not in bucket_indexes
+    assert bucket_indexes["bucket_start_1"]["expireAfterSeconds"] == (mongodb_client.HISTORY_RETENTION_DAYS + 1) * 86400
+
+def test_changed_retention_is_applied_with_coll_mod(db, monkeypatch):
+    stub = FakeDatabase()
+    monkeypatch.setattr(mongodb_client, "db", stub)
+    db.playback_history_buckets.create_index("bucket_start", expireAfterSeconds=91 * 86400)
+    monkeypatch.setattr(mongodb_client, "HISTORY_RETENTION_DAYS", 30)
+
+    mongodb_client.create_indexes()
+
+    assert stub.commands == [(
+        ("collMod", "playback_history_buckets"),
+        {"index": {"keyPattern": {"bucket_start": 1}, "expireAfterSeconds": 31 * 86400}}
+    )]
+
+def test_migrate_legacy_history(db):
+    played_at = datetime(2026, 10, 1, 12)
+    db.playback_history.insert_many([
+        {"google_id": GOOGLE_ID, "video_id": f"vid{i % 2}", "title": f"Song {i % 2}", "played_at": played_at - timedelta(hours=10 * i)}
+        for i in range(5)
+    ])
+
+    assert mongodb_client.migrate_legacy_playback_history(batch_size=2) == 5
+
+    assert db.playback_history.count_documents({}) == 0
+    assert sum(bucket["count"] for bucket in db.playback_history_buckets.find()) == 5
+    stats = {doc["video_id"]: doc["play_count"] for doc in db.track_stats.find()}
+    assert stats == {"vid0": 3, "vid1": 2}
+
+def test_migration_keeps_rows_whose_bucket_failed(db, monkeypatch):
+    db.playback_history.insert_one(
+        {"google_id": GOOGLE_ID, "video_id": "vid0", "title": "Song", "played_at": datetime(2026, 10, 1)}
+    )
+    monkeypatch.setattr(mongodb_client, "bulk_append_playback_history", lambda events: events)
+
+    assert mongodb_client.migrate_legacy_playback_history() == 0
+
+    assert db.playback_history.count_documents({}) == 1
+    assert db.track_stats.count_documents({}) == 0
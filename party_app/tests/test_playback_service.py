@@ -0,0 +1,83 @@
+import threading
+
+import services.playback_service as playback_service_module
+from services.playback_events import PlaybackEventEncoder
+from services.playback_service import PlaybackService
+
+USER = {"google_id": "google-123", "channel_name_commands": "user_google-123_commands"}
+
+class FakeUserService:
+    def __init__(self, video_id):
+        self.current_song = {"video_id": video_id, "state": "playing", "position": 0, "duration": 200}
+
+    def get_current_playback(self, google_id):
+        return {"google_id": google_id, "current_song": dict(self.current_song)}
+
+class FakePubNub:
+    def __init__(self, on_publish=None):
+        self.messages = []
+        self.on_publish = on_publish
+
+    def publish_message(self, channel, message):
+        self.messages.append(message)
+        if self.on_publish:
+            self.on_publish(message)
+
+class FakeSocketIO:
+    def __init__(self):
+        self.events = []
+        self.emitted = threading.Event()
+
+    def emit(self, event, payload, to=None):
+        self.events.append(payload)
+        self.emitted.set()
+
+def make_service(on_publish=None):
+    return PlaybackService(
+        FakeUserService("old"), None, None, None, FakePubNub(on_publish), FakeSocketIO(), PlaybackEventEncoder()
+    )
+
+def run(service, action):
+    service.socketio.emitted.clear()
+    job = service.submit(USER, {"action": action})
+    assert service.socketio.emitted.wait(2)
+    return job
+
+def test_next_is_forwarded_and_completes_on_device_confirmation():
+    service = make_service()
+    job = run(service, "next")
+    assert service.pubnub_client.messages == [{"action": "next"}]
+    assert job["status"] == "awaiting_device"
+    assert "current_song" not in service.socketio.events[-1]
+
+    # A report of the track that was already playing doesn't complete the job.
+    assert not service.confirm_track_change(USER["google_id"], {"video_id": "old", "state": "playing"})
+    assert service.confirm_track_change(USER["google_id"], {"video_id": "new", "state": "playing", "position": 0})
+    event = service.socketio.events[-1]
+    assert job["status"] == "done"
+    assert event["job_id"] == job["job_id"]
+    assert event["status"] == "done"
+    assert event["current_song"]["video_id"] == "new"
+
+def test_confirmation_before_the_job_returns_is_not_lost():
+    service = None
+
+    def report_immediately(message):
+        service.confirm_track_change(USER["google_id"], {"video_id": "new", "state": "playing", "position": 0})
+
+    service = make_service(report_immediately)
+    job = run(service, "previous")
+    assert job["status"] == "done"
+    assert [event["status"] for event in service.socketio.events] == ["done"]
+    assert service.socketio.events[0]["current_song"]["video_id"] == "new"
+
+def test_unconfirmed_track_change_reports_known_state(monkeypatch):
+    monkeypatch.setattr(playback_service_module, "PLAYBACK_CONFIRM_TIMEOUT", 0.05)
+    service = make_service()
+    job = run(service, "next")
+    service.socketio.emitted.clear()
+    assert service.socketio.emitted.wait(2)
+    event = service.socketio.events[-1]
+    assert job["status"] == "unconfirmed"
+    assert event["status"] == "unconfirmed"
+    assert event["current_song"]["video_id"] == "old"
@@ -0,0 +1,47 @@
+import pytest
+
+import services.playback_state_store as store_module
+from services.playback_state_store import PlaybackStateStore
+
+@pytest.fixture
+def written(monkeypatch):
+    batches = []
+    monkeypatch.setattr(store_module, "PLAYBACK_STATE_MAX_USERS", 2)
+    monkeypatch.setattr(store_module, "get_current_playback", lambda google_id: None)
+    monkeypatch.setattr(store_module, "update_current_playback", lambda google_id, song: None)
+    monkeypatch.setattr(store_module, "bulk_update_current_playback", lambda batch: batches.append(dict(batch)))
+    return batches
+
+def test_capacity_is_enforced_for_unflushed_states(written):
+    store = PlaybackStateStore()
+    for i in range(5):
+        store.put(f"user{i}", {"video_id": f"vid{i}"}, persist=False)
+
+    stats = store.stats()
+    assert stats["users"] <= 2
+    assert stats["dirty"] <= 2
+    # Everything pushed out of memory was written to Mongo first.
+    flushed = {google_id for batch in written for google_id in batch}
+    assert flushed == {"user0", "user1", "user2"}
+    assert store.get("user4")["current_song"] == {"video_id": "vid4"}
+
+def test_failed_forced_flush_keeps_states(written, monkeypatch):
+    def fail(batch):
+        raise RuntimeError("mongo unavailable")
+
+    monkeypatch.setattr(store_module, "bulk_update_current_playback", fail)
+    store = PlaybackStateStore()
+    for i in range(3):
+        store.put(f"user{i}", {"video_id": f"vid{i}"}, persist=False)
+    # Unsaved states are never dropped; the bound is restored by the next successful flush.
+    assert store.stats()["dirty"] == 3
+    monkeypatch.setattr(store_module, "bulk_update_current_playback", lambda batch: written.append(dict(batch)))
+    store.put("user3", {"video_id": "vid3"}, persist=False)
+    assert store.stats()["users"] <= 2
+
+def test_clean_states_are_evicted_oldest_first(written):
+    store = PlaybackStateStore()
+    for i in range(3):
+        store.put(f"user{i}", {"video_id": f"vid{i}"})
+    assert list(store._states) == ["user1", "user2"]
+    assert written == []
@@ -0,0 +1,96 @@
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from bson.objectid import ObjectId
+from flask import Flask
+
+mongomock = pytest.importorskip("mongomock")
+
+import mongodb_client
+import services.search_service as search_service_module
+from blueprints.search import search_bp
+from services.search_service import SearchService
+
+GOOGLE_ID = "google-123"
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock.MongoClient().db
+    for name in ["playlists", "favorite_songs", "playback_history_buckets", "track_stats"]:
+        monkeypatch.setattr(mongodb_client, f"{name}_collection", database[name])
+    return database
+
+class FakeUserService:
+    def __init__(self, user_doc):
+        self.user_doc = user_doc
+
+    def get_user_by_google_id(self, google_id):
+        return self.user_doc if google_id == self.user_doc["google_id"] else None
+
+@pytest.fixture
+def client(db):
+    user_doc = {"_id": ObjectId(), "google_id": GOOGLE_ID}
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.user_service = FakeUserService(user_doc)
+    app.search_service = SearchService()
+    app.register_blueprint(search_bp)
+    test_client = app.test_client()
+    with test_client.session_transaction() as session:
+        session["google_id"] = GOOGLE_ID
+    test_client.user_doc = user_doc
+    return test_client
+
+def test_autocomplete_includes_playlist_songs(client):
+    # The playlist endpoints key playlists by str(user["_id"]), not the Google ID.
+    owner_id = str(client.user_doc["_id"])
+    playlist_id = mongodb_client.create_playlist(owner_id, "Road trip")
+    mongodb_client.insert_playlist_songs(owner_id, playlist_id, [{"video_id": "vid1", "title": "Highway Tune"}])
+
+    response = client.get("/autocomplete?query=highway")
+    assert response.get_json() == [{"title": "Highway Tune", "video_id": "vid1"}]
+
+def test_autocomplete_does_not_leak_other_users_titles(db):
+    mongodb_client.add_favorite("someone-else", {
+        "video_id": "vid2", "title": "Private Anthem", "added_at": datetime.now(timezone.utc)
+    })
+    service = SearchService()
+    assert service._user_index(GOOGLE_ID, "owner").search("private") == []
+
+def test_user_index_is_built_once_for_concurrent_requests(db, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_history(google_id, limit):
+        calls.append(google_id)
+        started.set()
+        release.wait(5)
+        return []
+
+    monkeypatch.setattr(search_service_module, "get_recent_playback_history", slow_history)
+    service = SearchService()
+    builder = threading.Thread(target=service._user_index, args=(GOOGLE_ID, "owner"))
+    builder.start()
+    started.wait(5)
+    # A second request during the build doesn't start another one.
+    assert service._user_index(GOOGLE_ID, "owner") is None
+    release.set()
+    builder.join()
+    assert service._user_index(GOOGLE_ID, "owner") is not None
+    assert calls == [GOOGLE_ID]
+
+def test_failed_user_index_build_is_not_retried_immediately(db, monkeypatch):
+    calls = []
+
+    def failing_history(google_id, limit):
+        calls.append(google_id)
+        raise RuntimeError("mongo unavailable")
+
+    monkeypatch.setattr(search_service_module, "get_recent_playback_history", failing_history)
+    service = SearchService()
+    for _ in range(3):
+        assert service._user_index(GOOGLE_ID, "owner") is not None
+    assert calls == [GOOGLE_ID]
+    assert service.user_index_failures == 1
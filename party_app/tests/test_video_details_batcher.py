@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("yt_dlp")
+
+import youtube_api
+from youtube_api import VideoDetailsBatcher
+
+def test_caller_only_waits_for_its_own_batch(monkeypatch):
+    release_second = threading.Event()
+    fetched = []
+
+    def fetch(video_ids):
+        fetched.append(video_ids)
+        if len(fetched) > 1:
+            release_second.wait(5)
+        return {vid: {"title": vid} for vid in video_ids}, True
+
+    monkeypatch.setattr(youtube_api, "_fetch_videos_details", fetch)
+    batcher = VideoDetailsBatcher(window=0.05, max_batch=1, timeout=5)
+
+    results = {}
+    threads = [
+        threading.Thread(target=lambda vid=vid: results.__setitem__(vid, batcher.get(vid)))
+        for vid in ["vid1", "vid2"]
+    ]
+    threads[0].start()
+    while "vid1" not in batcher._pending and "vid1" not in results:
+        time.sleep(0.001)
+    threads[1].start()
+    threads[0].join(2)
+
+    try:
+        assert results["vid1"] == ({"title": "vid1"}, True)
+        assert "vid2" not in results
+    finally:
+        release_second.set()
+        threads[1].join(5)
+    assert results["vid2"] == ({"title": "vid2"}, True)
+    assert batcher.stats()["batches"] == 2
+
+def test_failed_batch_releases_waiters(monkeypatch):
+    def fetch(video_ids):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(youtube_api, "_fetch_videos_details", fetch)
+    batcher = VideoDetailsBatcher(window=0, timeout=2)
+
+    assert batcher.get("vid1") == (None, False)
+    assert batcher.get("vid2") == (None, False)
+    assert batcher.stats()["batches"] == 2
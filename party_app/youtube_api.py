@@ -2,13 +2,49 @@ import os
 import requests
 import logging
 import re
+import threading
+import time
 import yt_dlp
 
+from cache import TTLCache, MISSING
+from http_client import HttpClient
+from mongodb_client import get_cached_videos_details, save_cached_videos_details
+
 logger = logging.getLogger(__name__)
 
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 BASE_URL = "https://www.googleapis.com/youtube/v3"
 
+youtube_http = HttpClient(
+    BASE_URL,
+    timeouts={
+        "videos": float(os.getenv("YOUTUBE_VIDEOS_TIMEOUT", "5")),
+        "search": float(os.getenv("YOUTUBE_SEARCH_TIMEOUT", "8")),
+        "autocomplete": float(os.getenv("YOUTUBE_AUTOCOMPLETE_TIMEOUT", "2")),
+    },
+    max_retries=int(os.getenv("YOUTUBE_HTTP_MAX_RETRIES", "2")),
+    pool_size=int(os.getenv("YOUTUBE_HTTP_POOL_SIZE", "20")),
+    breaker_threshold=int(os.getenv("YOUTUBE_HTTP_BREAKER_THRESHOLD", "5")),
+    breaker_reset=int(os.getenv("YOUTUBE_HTTP_BREAKER_RESET", "30")),
+)
+
+VIDEO_CACHE_MAX_SIZE = int(os.getenv("VIDEO_CACHE_MAX_SIZE", "2048"))
+VIDEO_CACHE_TTL = int(os.getenv("VIDEO_CACHE_TTL", "86400"))
+VIDEO_CACHE_NEGATIVE_TTL = int(os.getenv("VIDEO_CACHE_NEGATIVE_TTL", "600"))
+VIDEO_CACHE_MONGO_ENABLED = os.getenv("VIDEO_CACHE_MONGO_ENABLED", "true").lower() == "true"
+
+video_details_cache = TTLCache(max_size=VIDEO_CACHE_MAX_SIZE, ttl=VIDEO_CACHE_TTL)
+video_details_mongo_stats = {"hits": 0, "misses": 0}
+
+VIDEOS_BATCH_SIZE = 50
+VIDEOS_BATCH_WINDOW = float(os.getenv("VIDEOS_BATCH_WINDOW", "0.02"))
+
+YDL_OPTS = {
+    'format': 'bestaudio/best',
+    'quiet': True,
+}
+_ydl_local = threading.local()
+
 def parse_iso8601_duration(iso_duration: str) -> int:
     pattern = r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?'
     match = re.match(pattern, iso_duration)
@@ -20,78 +56,222 @@ def parse_iso8601_duration(iso_duration: str) -> int:
     seconds = int(match.group(3) or 0)
     return hours * 3600 + minutes * 60 + seconds
 
-def get_video_details(video_id):
-    if not video_id:
-        logger.warning("No video_id provided in get_video_details.")
-        return None
+def _parse_video_item(item):
+    snippet = item.get("snippet", {})
+    content_details = item.get("contentDetails", {})
+
+    title = snippet.get("title", "Unknown Title")
+    thumbs = snippet.get("thumbnails", {})
+    if "high" in thumbs:
+        thumb_url = thumbs["high"]["url"]
+    elif "medium" in thumbs:
+        thumb_url = thumbs["medium"]["url"]
+    elif "default" in thumbs:
+        thumb_url = thumbs["default"]["url"]
+    else:
+        thumb_url = ""
+
+    iso_duration = content_details.get("duration", "PT0S")
+    duration_seconds = parse_iso8601_duration(iso_duration)
+
+    return {
+        "title": title,
+        "thumbnail_url": thumb_url,
+        "duration_seconds": duration_seconds
+    }
 
-    url = f"{BASE_URL}/videos"
+def _fetch_videos_details(video_ids):
     params = {
         "part": "snippet,contentDetails",
-        "id": video_id,
-        "key": YOUTUBE_API_KEY,
+        "id": ",".join(video_ids),
+        "key": YOUTUBE_API_KEY
     }
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        items = data.get("items", [])
-        if not items:
-            logger.warning(f"No video details found for {video_id}")
-            return None
-
-        item = items[0]
-        snippet = item.get("snippet", {})
-        content_details = item.get("contentDetails", {})
-
-        title = snippet.get("title", "Unknown Title")
-        thumbs = snippet.get("thumbnails", {})
-        if "high" in thumbs:
-            thumb_url = thumbs["high"]["url"]
-        elif "medium" in thumbs:
-            thumb_url = thumbs["medium"]["url"]
-        elif "default" in thumbs:
-            thumb_url = thumbs["default"]["url"]
+        data = youtube_http.get("videos", params=params)
+        results = {item["id"]: _parse_video_item(item) for item in data.get("items", []) if item.get("id")}
+        missing = [vid for vid in video_ids if vid not in results]
+        if missing:
+            logger.warning(f"No video details found for {missing}")
+        return results, True
+    except requests.RequestException as e:
+        logger.error(f"Error fetching YouTube video details: {e}")
+        return {}, False
+
+class _PendingLookup:
+    def __init__(self):
+        self.event = threading.Event()
+        self.details = None
+        self.cacheable = False
+
+class VideoDetailsBatcher:
+    def __init__(self, window=0.02, max_batch=VIDEOS_BATCH_SIZE, timeout=15):
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._flushing = False
+        self.requests = 0
+        self.batches = 0
+
+    def get(self, video_id):
+        with self._lock:
+            self.requests += 1
+            lookup = self._pending.get(video_id)
+            if lookup is None:
+                lookup = _PendingLookup()
+                self._pending[video_id] = lookup
+            start_flusher = not self._flushing
+            self._flushing = True
+
+        # Batches are fetched off the request thread, so a caller only waits for the batch holding its id.
+        if start_flusher:
+            threading.Thread(target=self._flush, name="VideoDetailsBatcher", daemon=True).start()
+
+        if not lookup.event.wait(self.timeout):
+            logger.warning(f"Timed out waiting for batched details of {video_id}")
+        return lookup.details, lookup.cacheable
+
+    def _flush(self):
+        drained = False
+        try:
+            time.sleep(self.window)
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._flushing = False
+                        drained = True
+                        return
+                    video_ids = list(self._pending)[:self.max_batch]
+                    batch = {vid: self._pending.pop(vid) for vid in video_ids}
+                    self.batches += 1
+
+                results, ok = {}, False
+                try:
+                    results, ok = _fetch_videos_details(video_ids)
+                except Exception as e:
+                    logger.error(f"Error fetching batched video details for {video_ids}: {e}")
+                finally:
+                    # Waiters of a failed batch get an uncacheable empty result instead of timing out.
+                    for vid, lookup in batch.items():
+                        lookup.details = results.get(vid)
+                        lookup.cacheable = ok
+                        lookup.event.set()
+        finally:
+            if not drained:
+                with self._lock:
+                    self._flushing = False
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "batches": self.batches}
+
+video_details_batcher = VideoDetailsBatcher(window=VIDEOS_BATCH_WINDOW)
+
+def _load_cached_videos_details(video_ids):
+    if not VIDEO_CACHE_MONGO_ENABLED or not video_ids:
+        return {}
+    try:
+        docs = get_cached_videos_details(video_ids)
+        found = {doc["video_id"]: doc.get("details") for doc in docs}
+    except Exception as e:
+        logger.error(f"Error reading video_metadata for {video_ids}: {e}")
+        return {}
+    video_details_mongo_stats["hits"] += len(found)
+    video_details_mongo_stats["misses"] += len(video_ids) - len(found)
+    return found
+
+def _store_videos_details(results, to_mongo=True):
+    entries = []
+    for video_id, details in results.items():
+        ttl = VIDEO_CACHE_TTL if details else VIDEO_CACHE_NEGATIVE_TTL
+        video_details_cache.set(video_id, details, ttl)
+        entries.append((video_id, details, ttl))
+
+    if not to_mongo or not VIDEO_CACHE_MONGO_ENABLED or not entries:
+        return
+    try:
+        save_cached_videos_details(entries)
+    except Exception as e:
+        logger.error(f"Error saving video_metadata for {list(results)}: {e}")
+
+def get_videos_details(video_ids):
+    video_ids = list(dict.fromkeys(vid for vid in video_ids if vid))
+    results = {}
+    missing = []
+    for video_id in video_ids:
+        details = video_details_cache.get(video_id, MISSING)
+        if details is MISSING:
+            missing.append(video_id)
         else:
-            thumb_url = ""
+            results[video_id] = details
 
-        iso_duration = content_details.get("duration", "PT0S")
-        duration_seconds = parse_iso8601_duration(iso_duration)
+    from_mongo = _load_cached_videos_details(missing)
+    if from_mongo:
+        _store_videos_details(from_mongo, to_mongo=False)
+        results.update(from_mongo)
+        missing = [vid for vid in missing if vid not in from_mongo]
 
-        return {
-            "title": title,
-            "thumbnail_url": thumb_url,
-            "duration_seconds": duration_seconds
-        }
+    for start in range(0, len(missing), VIDEOS_BATCH_SIZE):
+        chunk = missing[start:start + VIDEOS_BATCH_SIZE]
+        fetched, ok = _fetch_videos_details(chunk)
+        if ok:
+            fetched = {vid: fetched.get(vid) for vid in chunk}
+            _store_videos_details(fetched)
+        results.update(fetched)
 
-    except requests.RequestException as e:
-        logger.error(f"Error fetching YouTube video details: {e}")
+    return {vid: results.get(vid) for vid in video_ids}
+
+def get_video_details(video_id):
+    if not video_id:
+        logger.warning("No video_id provided in get_video_details.")
         return None
-    
+
+    details = video_details_cache.get(video_id, MISSING)
+    if details is not MISSING:
+        return details
+
+    from_mongo = _load_cached_videos_details([video_id])
+    if video_id in from_mongo:
+        _store_videos_details(from_mongo, to_mongo=False)
+        return from_mongo[video_id]
+
+    details, cacheable = video_details_batcher.get(video_id)
+    if cacheable:
+        _store_videos_details({video_id: details})
+    return details
+
+def get_video_cache_stats():
+    stats = video_details_cache.stats()
+    stats["mongo"] = dict(video_details_mongo_stats, enabled=VIDEO_CACHE_MONGO_ENABLED)
+    stats["batcher"] = video_details_batcher.stats()
+    return stats
+
+def _get_ydl():
+    ydl = getattr(_ydl_local, "ydl", None)
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(YDL_OPTS)
+        _ydl_local.ydl = ydl
+    return ydl
+
 def get_direct_stream_url(video_id: str) -> str:
     if not video_id:
         logger.warning("No video_id provided to get_direct_stream_url.")
         return ""
 
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'quiet': True,
-    }
     full_url = f"https://www.youtube.com/watch?v={video_id}"
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(full_url, download=False)
-            stream_url = info.get('url')
-            if not stream_url:
-                logger.warning(f"No direct stream URL found for {video_id}")
-                return ""
-            return stream_url
+        info = _get_ydl().extract_info(full_url, download=False)
+        stream_url = info.get('url')
+        if not stream_url:
+            logger.warning(f"No direct stream URL found for {video_id}")
+            return ""
+        return stream_url
     except Exception as e:
         logger.error(f"Error in get_direct_stream_url({video_id}): {e}")
-        return ""    
+        return ""
 
 def search_youtube_music(query, max_results=20, page_token=None):
-    url = f"{BASE_URL}/search"
     params = {
         "part": "snippet",
         "q": query,
@@ -103,15 +283,12 @@ def search_youtube_music(query, max_results=20, page_token=None):
     if page_token:
         params["pageToken"] = page_token
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json()
+        return youtube_http.get("search", params=params)
     except requests.RequestException as e:
         logger.error(f"Error fetching YouTube search results: {e}")
         return None
 
 def autocomplete_music(query, max_results=3):
-    url = f"{BASE_URL}/search"
     params = {
         "part": "snippet",
         "q": query,
@@ -121,9 +298,7 @@ def autocomplete_music(query, max_results=3):
         "maxResults": max_results,
     }
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+        data = youtube_http.get("search", params=params, name="autocomplete")
         items = data.get("items", [])
         unique_titles = {}
         for item in items:
@@ -153,17 +328,9 @@ def control_music(action):
     return True
 
 def fetch_video_title(video_id):
-    url = f"{BASE_URL}/videos"
-    params = {"part": "snippet", "id": video_id, "key": YOUTUBE_API_KEY}
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        items = data.get("items", [])
-        if items:
-            title = items[0]["snippet"]["title"]
-            logger.info(f"Fetched video title for {video_id}: {title}")
-            return title
-    except requests.RequestException as e:
-        logger.error(f"Error fetching video title: {e}")
+    details = get_video_details(video_id)
+    if details:
+        title = details["title"]
+        logger.info(f"Fetched video title for {video_id}: {title}")
+        return title
     return None
@@ -3,25 +3,38 @@ import time
 from pubnub.pubnub import PubNub
 from pubnub_pi.pubnub_config import get_pubnub_config
 from pubnub_pi.listeners import CommandListener
+from pubnub_pi.publisher import PubNubPublisher
 
 from player.youtube_player import YouTubePlayer
 from player.player import Player
+from player.status_reporter import StatusReporter
+from player.audio_cache import AudioCache
+
+USER_ID = "114379767835747196870"
 
 
 def main():
     pnconfig = get_pubnub_config()
     pubnub = PubNub(pnconfig)
     player = Player()
-    youtube_player = YouTubePlayer()
+    audio_cache = AudioCache()
+    youtube_player = YouTubePlayer(audio_cache=audio_cache)
+    youtube_player.attach_clock(player)
+
+    status_channel = f"user_{USER_ID}_status"
+    status_reporter = StatusReporter(player, PubNubPublisher(status_channel), USER_ID)
+    player.on_update_callback = status_reporter.notify
 
     led_ring = None
     command_listener = CommandListener(player, youtube_player, led_ring)
 
+    command_listener.executor.start()
     pubnub.add_listener(command_listener)
-    command_channel = "user_114379767835747196870_commands"
+    command_channel = f"user_{USER_ID}_commands"
     print(f"[main] Subscribing to '{command_channel}'...")
     pubnub.subscribe().channels(command_channel).execute()
     player.start_background()
+    status_reporter.start()
 
     try:
         print("[main] Running. Press Ctrl+C to exit.")
@@ -30,9 +43,14 @@ def main():
     except KeyboardInterrupt:
         print("[main] Exiting...")
     finally:
-        player.stop_background()
         pubnub.unsubscribe().channels(command_channel).execute()
+        command_listener.executor.stop()
+        status_reporter.stop()
+        player.stop_background()
+        print(f"[main] Player clock: {player.stats()}")
         youtube_player.stop()
+        print(f"[main] Media stats: {youtube_player.stats()}")
+        print(f"[main] Audio cache: {audio_cache.stats()}")
         print("[main] Shutdown complete.")
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+import os
+import re
+import queue
+import threading
+from collections import OrderedDict
+
+import requests
+
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.expanduser("~/.cache/partysense/audio"))
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "512"))
+AUDIO_CACHE_CHUNK_SIZE = 256 * 1024
+
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{6,20}$")
+
+class AudioCache:
+    def __init__(self, cache_dir=AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._queue = queue.Queue()
+        self._inflight = set()
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.fill_failures = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+        self._worker = threading.Thread(target=self._run, name="audio-cache-fill", daemon=True)
+        self._worker.start()
+
+    def _path(self, video_id):
+        return os.path.join(self.cache_dir, f"{video_id}.audio")
+
+    def _load_index(self):
+        # Rebuild the LRU order from the files left by previous runs, oldest access first.
+        files = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".part"):
+                os.remove(path)
+            elif name.endswith(".audio"):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-len(".audio")], stat.st_size))
+        for _, video_id, size in sorted(files):
+            self._entries[video_id] = size
+            self._size += size
+        print(f"[AudioCache] Loaded {len(self._entries)} cached tracks ({self._size // (1024 * 1024)} MB)")
+
+    def cacheable(self, video_id):
+        return bool(video_id) and VIDEO_ID_PATTERN.match(video_id) is not None
+
+    def lookup(self, video_id):
+        if not self.cacheable(video_id):
+            return None
+        with self._lock:
+            if video_id not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(video_id)
+            self.hits += 1
+        path = self._path(video_id)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._forget(video_id)
+            return None
+        return path
+
+    def fill_async(self, video_id, url):
+        if not self.cacheable(video_id) or not url:
+            return
+        with self._lock:
+            if video_id in self._entries or video_id in self._inflight:
+                return
+            self._inflight.add(video_id)
+        self._queue.put((video_id, url))
+
+    def _run(self):
+        while True:
+            video_id, url = self._queue.get()
+            try:
+                self._fill(video_id, url)
+            except Exception as e:
+                with self._lock:
+                    self.fill_failures += 1
+                print(f"[AudioCache] Failed to cache {video_id}: {e}")
+            finally:
+                with self._lock:
+                    self._inflight.discard(video_id)
+
+    def _fill(self, video_id, url):
+        part_path = self._path(video_id) + ".part"
+        size = 0
+        try:
+            with requests.get(url, stream=True, timeout=10) as response:
+                response.raise_for_status()
+                with open(part_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=AUDIO_CACHE_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise ValueError("track is larger than the whole cache")
+                        f.write(chunk)
+            os.replace(part_path, self._path(video_id))
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+        with self._lock:
+            self._entries[video_id] = size
+            self._size += size
+            self.fills += 1
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old_id = next(iter(self._entries))
+                self._forget(old_id)
+                self.evictions += 1
+                try:
+                    os.remove(self._path(old_id))
+                except OSError:
+                    pass
+        print(f"[AudioCache] Cached {video_id} ({size // 1024} KB)")
+
+    def _forget(self, video_id):
+        size = self._entries.pop(video_id, None)
+        if size is not None:
+            self._size -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "tracks": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "fills": self.fills,
+                "fill_failures": self.fill_failures,
+                "evictions": self.evictions
+            }
@@ -1,85 +1,142 @@
+import os
 import threading
 import time
 
+PLAYER_RECONCILE_INTERVAL = float(os.getenv("PLAYER_RECONCILE_INTERVAL", "5"))
+PLAYER_DRIFT_TOLERANCE = float(os.getenv("PLAYER_DRIFT_TOLERANCE", "0.5"))
+
 class Player:
-    def __init__(self, on_update_callback=None):
+    def __init__(self, on_update_callback=None, time_source=None):
         self.state = "paused"
         self.duration = 0
-        self.position = 0
+        self.rate = 1.0
         self.video_id = "unknown"
         self.updated_at = time.time()
+        self._base_position = 0.0
+        self._base_time = time.monotonic()
         self.lock = threading.Lock()
         self.thread = None
-        self.stop_flag = False
+        self.stop_event = threading.Event()
         self.on_update_callback = on_update_callback
+        self.time_source = time_source
+        self.reconciles = 0
+        self.corrections = 0
+
+    # Position is base + elapsed * rate, anchored whenever state or position changes.
+    def _position_at(self, now):
+        if self.state != "playing":
+            return self._base_position
+        position = self._base_position + (now - self._base_time) * self.rate
+        return min(position, self.duration) if self.duration else position
+
+    def _anchor(self, position, now=None):
+        self._base_position = position
+        self._base_time = time.monotonic() if now is None else now
+        self.updated_at = time.time()
+
+    @property
+    def position(self):
+        with self.lock:
+            return self._position_at(time.monotonic())
 
     def load_track(self, duration: float, video_id: str):
         with self.lock:
             self.duration = duration
-            self.position = 0
             self.state = "paused"
             self.video_id = video_id
-            self.updated_at = time.time()
+            self._anchor(0.0)
         self._notify_update()
 
     def play(self):
         with self.lock:
+            now = time.monotonic()
+            self._anchor(self._position_at(now), now)
             self.state = "playing"
-            self.updated_at = time.time()
         self._notify_update()
 
     def pause(self):
         with self.lock:
+            now = time.monotonic()
+            self._anchor(self._position_at(now), now)
             self.state = "paused"
-            self.updated_at = time.time()
         self._notify_update()
 
     def seek(self, new_position: float):
         with self.lock:
-            self.position = min(max(new_position, 0), self.duration)
-            self.updated_at = time.time()
+            upper = self.duration if self.duration else new_position
+            self._anchor(min(max(new_position, 0), upper))
+        self._notify_update()
+
+    def set_rate(self, rate: float):
+        with self.lock:
+            now = time.monotonic()
+            self._anchor(self._position_at(now), now)
+            self.rate = rate
         self._notify_update()
 
     def stop(self):
         with self.lock:
             self.state = "paused"
-            self.position = 0
-            self.updated_at = time.time()
+            self._anchor(0.0)
+        self._notify_update()
+
+    def reconcile(self, actual_position: float):
+        # Re-anchor on the media player's own clock when the model has drifted.
+        with self.lock:
+            self.reconciles += 1
+            if self.state != "playing":
+                return
+            now = time.monotonic()
+            if abs(self._position_at(now) - actual_position) <= PLAYER_DRIFT_TOLERANCE:
+                return
+            self.corrections += 1
+            self._base_position = actual_position
+            self._base_time = now
+
+    def on_media_end(self):
+        with self.lock:
+            self.state = "paused"
+            self._anchor(self.duration or self._position_at(time.monotonic()))
         self._notify_update()
 
     def start_background(self):
-        self.stop_flag = False
-        self.thread = threading.Thread(target=self._loop)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name="player-clock", daemon=True)
         self.thread.start()
 
     def stop_background(self):
-        self.stop_flag = True
+        self.stop_event.set()
         if self.thread:
             self.thread.join()
 
     def _loop(self):
-        while not self.stop_flag:
+        while not self.stop_event.wait(PLAYER_RECONCILE_INTERVAL):
             with self.lock:
-                if self.state == "playing":
-                    self.position += 1
-                    if self.position >= self.duration:
-                        self.position = self.duration
-                        self.state = "paused"
-                        self.updated_at = time.time()
-                        self._notify_update()
-            time.sleep(1)
+                playing = self.state == "playing"
+                finished = playing and self.duration and self._position_at(time.monotonic()) >= self.duration
+            if finished:
+                self.on_media_end()
+                continue
+            if playing and self.time_source:
+                actual = self.time_source()
+                if actual is not None:
+                    self.reconcile(actual)
 
     def get_current_state(self):
         with self.lock:
             return {
                 "state": self.state,
-                "position": self.position,
+                "position": self._position_at(time.monotonic()),
                 "duration": self.duration,
+                "rate": self.rate,
                 "video_id": self.video_id,
                 "updated_at": self.updated_at
             }
 
+    def stats(self):
+        with self.lock:
+            return {"reconciles": self.reconciles, "corrections": self.corrections}
+
     def _notify_update(self):
         if self.on_update_callback:
             self.on_update_callback()
-
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+STATUS_HEARTBEAT_INTERVAL = float(os.getenv("STATUS_HEARTBEAT_INTERVAL", "15"))
+STATUS_DEBOUNCE = float(os.getenv("STATUS_DEBOUNCE", "0.2"))
+STATUS_POSITION_TOLERANCE = float(os.getenv("STATUS_POSITION_TOLERANCE", "2"))
+
+TRANSITION_FIELDS = ("state", "video_id", "duration")
+
+class StatusReporter:
+    def __init__(self, player, publisher, user_id,
+                 heartbeat_interval=STATUS_HEARTBEAT_INTERVAL,
+                 debounce=STATUS_DEBOUNCE,
+                 position_tolerance=STATUS_POSITION_TOLERANCE):
+        self.player = player
+        self.publisher = publisher
+        self.user_id = user_id
+        self.heartbeat_interval = heartbeat_interval
+        self.debounce = debounce
+        self.position_tolerance = position_tolerance
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_sent = None
+        self._last_sent_at = 0.0
+        self._heartbeat_due = 0.0
+        self.sent = 0
+        self.suppressed = 0
+        self.coalesced = 0
+        self._pending_notifications = 0
+        self._lock = threading.Lock()
+
+    def notify(self):
+        # Called from Player._notify_update, possibly while the player lock is held,
+        # so never read the player state here.
+        with self._lock:
+            self._pending_notifications += 1
+        self._wake.set()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="status-reporter", daemon=True)
+        self._thread.start()
+        print(f"[StatusReporter] Started (heartbeat={self.heartbeat_interval}s, debounce={self.debounce}s)")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+        print(f"[StatusReporter] Stopped. {self.stats()}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            woken = self._wake.wait(self._seconds_until_heartbeat())
+            if self._stop.is_set():
+                break
+            if woken:
+                # Let a burst of updates (e.g. load_track + seek + play) settle into one report.
+                self._stop.wait(self.debounce)
+                self._wake.clear()
+                with self._lock:
+                    notifications = self._pending_notifications
+                    self._pending_notifications = 0
+                if notifications > 1:
+                    self.coalesced += notifications - 1
+            self._report(self.player.get_current_state())
+
+    def _seconds_until_heartbeat(self):
+        return max(self._heartbeat_due - time.monotonic(), 0)
+
+    def _expected_position(self, now):
+        last = self._last_sent
+        if last["state"] != "playing":
+            return last["position"]
+        return min(last["position"] + (now - self._last_sent_at), last["duration"] or float("inf"))
+
+    def _should_send(self, state, now):
+        if self._last_sent is None:
+            return True
+        if any(state[field] != self._last_sent[field] for field in TRANSITION_FIELDS):
+            return True
+        if abs(state["position"] - self._expected_position(now)) > self.position_tolerance:
+            return True
+        return state["state"] == "playing" and now - self._last_sent_at >= self.heartbeat_interval
+
+    def _report(self, state):
+        now = time.monotonic()
+        self._heartbeat_due = now + self.heartbeat_interval
+        if state["video_id"] == "unknown":
+            return
+        if not self._should_send(state, now):
+            self.suppressed += 1
+            return
+
+        self.publisher.publish_message({
+            "user_id": self.user_id,
+            "current_song": {
+                "video_id": state["video_id"],
+                "state": "pause" if state["state"] == "paused" else state["state"],
+                "position": round(state["position"], 2),
+                "duration": state["duration"]
+            }
+        })
+        self._last_sent = state
+        self._last_sent_at = now
+        self.sent += 1
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "suppressed": self.suppressed,
+            "coalesced": self.coalesced
+        }
@@ -1,9 +1,14 @@
+import os
 import vlc
 import time
+import queue
 import threading
 
+PLAYER_CROSSFADE_SECONDS = float(os.getenv("PLAYER_CROSSFADE_SECONDS", "0"))
+CROSSFADE_STEP_SECONDS = 0.05
+
 class YouTubePlayer:
-    def __init__(self):
+    def __init__(self, crossfade_seconds=PLAYER_CROSSFADE_SECONDS, audio_cache=None):
         self._instance = vlc.Instance([
             "--aout=alsa",
             "--network-caching=300",
@@ -11,43 +16,315 @@ class YouTubePlayer:
             "--file-caching=300",
             "--quiet"
         ])
+        # Two media players: the active one and a standby that pre-buffers the next track.
         self._player = self._instance.media_player_new()
+        self._standby = self._instance.media_player_new()
         self._lock = threading.Lock()
         self.current_stream_url = None
+        self.crossfade_seconds = crossfade_seconds
+        self.audio_cache = audio_cache
+
+        # State for the media currently being opened; applied once VLC reports it is playing.
+        self._loading = False
+        self._load_started = None
+        self._pending_seek = None
+        self._pending_volume = None
+        self._pending_pause = False
+        self._stall_started = None
+
+        self._standby_url = None
+        self._standby_priming = False
+        self._standby_ready = False
+        self._fade_volume = None
+        self._fade_generation = 0
+        self._fading = False
+        self._deferred_preload = None
+
+        self.loads = 0
+        self.ttfa_count = 0
+        self.ttfa_total = 0.0
+        self.last_ttfa = None
+        self.stalls = 0
+        self.stall_seconds = 0.0
+        self.errors = 0
+        self.preloads = 0
+        self.preload_hits = 0
+        self.preload_misses = 0
+
+        # libvlc must not be called from its own event callbacks, so they only enqueue.
+        self._events = queue.Queue()
+        self._controller = threading.Thread(target=self._run_controller, name="vlc-controller", daemon=True)
+        self._controller.start()
+
+        for media_player in (self._player, self._standby):
+            events = media_player.event_manager()
+            events.event_attach(
+                vlc.EventType.MediaPlayerPlaying,
+                lambda event, mp=media_player: self._events.put(("playing", mp, None))
+            )
+            events.event_attach(
+                vlc.EventType.MediaPlayerBuffering,
+                lambda event, mp=media_player: self._events.put(("buffering", mp, event.u.new_cache))
+            )
+            events.event_attach(
+                vlc.EventType.MediaPlayerEncounteredError,
+                lambda event, mp=media_player: self._events.put(("error", mp, None))
+            )
+
+    def attach_clock(self, player):
+        # VLC events fire on libvlc's own thread; the handlers only touch the Player model.
+        # Events from the standby (pre-buffering or fading out) are ignored.
+        for media_player in (self._player, self._standby):
+            events = media_player.event_manager()
+            events.event_attach(
+                vlc.EventType.MediaPlayerTimeChanged,
+                lambda event, mp=media_player: mp is self._player and player.reconcile(event.u.new_time / 1000.0)
+            )
+            events.event_attach(
+                vlc.EventType.MediaPlayerEndReached,
+                lambda event, mp=media_player: mp is self._player and player.on_media_end()
+            )
+        player.time_source = self.get_time
+
+    def get_time(self):
+        millis = self._player.get_time()
+        if millis is None or millis < 0:
+            return None
+        return millis / 1000.0
+
+    def _media_for(self, url, video_id):
+        # Replays of a cached track open the local file; misses stream and fill the cache behind.
+        if self.audio_cache:
+            path = self.audio_cache.lookup(video_id)
+            if path:
+                return self._instance.media_new_path(path)
+            self.audio_cache.fill_async(video_id, url)
+        return self._instance.media_new(url)
 
-    def play_url(self, url: str, position: float = 0, volume: int = 50):
+    def play_url(self, url: str, position: float = 0, volume: int = 50, video_id: str = None):
         with self._lock:
             if not url:
                 print("[YouTubePlayer] No URL provided to play_url().")
                 return
 
-            media = self._instance.media_new(url)
+            if url == self._standby_url:
+                self._swap_to_standby(position, volume)
+                return
+            if self._standby_url:
+                self.preload_misses += 1
+
+            self._cancel_fade()
+            media = self._media_for(url, video_id)
             self._player.set_media(media)
+            self._start_loading(position, volume)
             self._player.play()
             self.current_stream_url = url
 
-            start_wait = time.time()
-            while not self._player.is_playing():
-                time.sleep(0.05)
-                if (time.time() - start_wait) > 3.0:
-                    break
+    def preload(self, url: str, video_id: str = None):
+        with self._lock:
+            if not url or url in (self._standby_url, self.current_stream_url):
+                return
+            if self._fading:
+                # The standby is still fading out the previous track; preload once it is done.
+                self._deferred_preload = (url, video_id)
+                return
+            self._preload(url, video_id)
+
+    def _preload(self, url, video_id):
+        media = self._media_for(url, video_id)
+        self._standby.set_media(media)
+        self._standby.audio_set_volume(0)
+        self._standby_url = url
+        self._standby_priming = True
+        self._standby_ready = False
+        self.preloads += 1
+        # Start muted so VLC opens the stream and fills its cache; paused as soon as it plays.
+        self._standby.play()
+        print(f"[YouTubePlayer] Preloading next track {url}")
+
+    def _start_loading(self, position, volume):
+        self._loading = True
+        self._load_started = time.monotonic()
+        self._pending_seek = position if position else None
+        self._pending_volume = volume
+        self._pending_pause = False
+        self._stall_started = None
+        self.loads += 1
+
+    def _swap_to_standby(self, position, volume):
+        self.preload_hits += 1
+        self._cancel_fade()
+        outgoing = self._player
+        self._player, self._standby = self._standby, outgoing
+        self.current_stream_url = self._standby_url
+        ready = self._standby_ready
+        self._standby_url = None
+        self._standby_priming = False
+        self._standby_ready = False
 
-            self._player.set_time(int(position * 1000))
-            self._player.audio_set_volume(int(volume * 2))
+        self._start_loading(position, volume)
+        # Priming may have advanced the standby a little; always rewind to the requested position.
+        self._pending_seek = position
+        if self.crossfade_seconds > 0 and outgoing.is_playing():
+            # The volume is ramped by the fade thread once the new track is audible.
+            self._pending_volume = None
+            self._fade_volume = volume
+            self._fading = True
+        else:
+            outgoing.stop()
+        self._player.play()
+        print(f"[YouTubePlayer] Switched to preloaded track (buffered={ready})")
+
+    def _cancel_fade(self):
+        self._fade_generation += 1
+        self._fade_volume = None
+        self._fading = False
+        self._deferred_preload = None
+        if self._standby_url is None:
+            self._standby.stop()
+
+    def _start_fade(self, volume):
+        generation = self._fade_generation
+        incoming, outgoing = self._player, self._standby
+        threading.Thread(
+            target=self._run_fade, args=(generation, incoming, outgoing, volume),
+            name="vlc-crossfade", daemon=True
+        ).start()
+
+    def _run_fade(self, generation, incoming, outgoing, volume):
+        steps = max(int(self.crossfade_seconds / CROSSFADE_STEP_SECONDS), 1)
+        target = int(volume * 2)
+        start = outgoing.audio_get_volume()
+        for step in range(1, steps + 1):
+            with self._lock:
+                if generation != self._fade_generation:
+                    return
+                incoming.audio_set_volume(int(target * step / steps))
+                outgoing.audio_set_volume(int(start * (steps - step) / steps))
+            time.sleep(CROSSFADE_STEP_SECONDS)
+        with self._lock:
+            if generation != self._fade_generation:
+                return
+            self._fading = False
+            outgoing.stop()
+            if self._deferred_preload:
+                self._preload(*self._deferred_preload)
+                self._deferred_preload = None
+
+    def resume(self):
+        with self._lock:
+            self._pending_pause = False
+            self._player.play()
 
     def pause(self):
         with self._lock:
-            if self._player.is_playing():
+            if self._loading:
+                self._pending_pause = True
+            elif self._player.is_playing():
                 self._player.pause()
 
     def stop(self):
         with self._lock:
+            self._loading = False
+            self._pending_seek = None
+            self._standby_url = None
+            self._cancel_fade()
             self._player.stop()
 
     def seek(self, position: float):
         with self._lock:
-            self._player.set_time(int(position * 1000))
+            if self._loading:
+                self._pending_seek = position
+            else:
+                self._player.set_time(int(position * 1000))
 
     def set_volume(self, volume: int):
         with self._lock:
-            self._player.audio_set_volume(int(volume * 2))
+            if self._loading:
+                self._pending_volume = volume
+            elif self._fade_volume is not None:
+                self._fade_volume = volume
+            else:
+                self._player.audio_set_volume(int(volume * 2))
+
+    def _run_controller(self):
+        while True:
+            kind, media_player, value = self._events.get()
+            try:
+                with self._lock:
+                    if media_player is self._player:
+                        getattr(self, f"_on_{kind}")(value)
+                    else:
+                        self._on_standby_event(kind)
+            except Exception as e:
+                print(f"[YouTubePlayer] Error handling VLC event '{kind}': {e}")
+
+    def _on_standby_event(self, kind):
+        if kind == "playing" and self._standby_priming:
+            self._standby.set_pause(1)
+            self._standby_priming = False
+            self._standby_ready = True
+        elif kind == "error" and self._standby_url:
+            print(f"[YouTubePlayer] Preload failed for {self._standby_url}")
+            self._standby_url = None
+            self._standby_priming = False
+            self._standby_ready = False
+
+    def _on_playing(self, _):
+        now = time.monotonic()
+        if self._stall_started is not None:
+            self.stall_seconds += now - self._stall_started
+            self._stall_started = None
+        if not self._loading:
+            return
+
+        self._loading = False
+        ttfa = now - self._load_started
+        self.ttfa_count += 1
+        self.ttfa_total += ttfa
+        self.last_ttfa = ttfa
+        if self._pending_seek is not None:
+            self._player.set_time(int(self._pending_seek * 1000))
+            self._pending_seek = None
+        if self._pending_volume is not None:
+            self._player.audio_set_volume(int(self._pending_volume * 2))
+            self._pending_volume = None
+        if self._fade_volume is not None:
+            self._start_fade(self._fade_volume)
+            self._fade_volume = None
+        if self._pending_pause:
+            self._player.set_pause(1)
+            self._pending_pause = False
+        print(f"[YouTubePlayer] First audio after {ttfa * 1000:.0f} ms")
+
+    def _on_buffering(self, cache):
+        # Buffering events during the initial load are expected; only count stalls mid-playback.
+        if self._loading:
+            return
+        if cache < 100 and self._stall_started is None:
+            self._stall_started = time.monotonic()
+            self.stalls += 1
+        elif cache >= 100 and self._stall_started is not None:
+            self.stall_seconds += time.monotonic() - self._stall_started
+            self._stall_started = None
+
+    def _on_error(self, _):
+        self.errors += 1
+        self._loading = False
+        self._pending_seek = None
+        self._cancel_fade()
+        print(f"[YouTubePlayer] VLC reported an error for {self.current_stream_url}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loads": self.loads,
+                "avg_ttfa_ms": round(self.ttfa_total / self.ttfa_count * 1000, 1) if self.ttfa_count else 0.0,
+                "last_ttfa_ms": round(self.last_ttfa * 1000, 1) if self.last_ttfa is not None else None,
+                "stalls": self.stalls,
+                "stall_seconds": round(self.stall_seconds, 2),
+                "errors": self.errors,
+                "preloads": self.preloads,
+                "preload_hits": self.preload_hits,
+                "preload_misses": self.preload_misses
+            }
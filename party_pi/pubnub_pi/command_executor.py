@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+from collections import deque
+
+COMMAND_QUEUE_SIZE = int(os.getenv("COMMAND_QUEUE_SIZE", "32"))
+
+# Pending commands made pointless by a newer command; only the newest one needs to run.
+SUPERSEDES = {
+    "play_direct": {"play_direct", "pause", "seek", "stop"},
+    "stop": {"play_direct", "pause", "seek", "stop", "preload"},
+    "pause": {"pause"},
+    "seek": {"seek"},
+    "set_volume": {"set_volume"},
+    "set_mode": {"set_mode"},
+    "preload": {"preload"},
+    "update_preferences": {"update_preferences"}
+}
+
+class CommandExecutor:
+    def __init__(self, handler, max_size=COMMAND_QUEUE_SIZE):
+        self.handler = handler
+        self.max_size = max_size
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        self.received = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="command-executor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+        print(f"[CommandExecutor] Stopped. {self.stats()}")
+
+    def submit(self, command):
+        action = command.get("action")
+        superseded = SUPERSEDES.get(action, set())
+        with self._cond:
+            self.received += 1
+            if superseded:
+                kept = deque(item for item in self._pending if item[0].get("action") not in superseded)
+                self.coalesced += len(self._pending) - len(kept)
+                self._pending = kept
+            if len(self._pending) >= self.max_size:
+                dropped, _ = self._pending.popleft()
+                self.dropped += 1
+                print(f"[CommandExecutor] Queue full, dropping oldest command '{dropped.get('action')}'")
+            self._pending.append((command, time.monotonic()))
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                command, enqueued_at = self._pending.popleft()
+                wait = time.monotonic() - enqueued_at
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+            try:
+                self.handler(command)
+                self.executed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[CommandExecutor] Command '{command.get('action')}' failed: {e}")
+
+    def stats(self):
+        with self._cond:
+            started = self.executed + self.failed
+            return {
+                "received": self.received,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": len(self._pending),
+                "avg_wait_ms": round(self.total_wait / started * 1000, 1) if started else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 1)
+            }
@@ -1,5 +1,6 @@
 from pubnub.callbacks import SubscribeCallback
 from pubnub.models.consumer.pubsub import PNMessageResult
+from pubnub_pi.command_executor import CommandExecutor
 
 class CommandListener(SubscribeCallback):
     def __init__(self, player, youtube_player, led_ring=None):
@@ -7,14 +8,19 @@ class CommandListener(SubscribeCallback):
         self.player = player
         self.youtube_player = youtube_player
         self.led_ring = led_ring
+        self.executor = CommandExecutor(self.handle_command)
 
     def message(self, pubnub, message: PNMessageResult):
         msg = message.message
         print(f"[CommandListener] Received command: {msg}")
 
-        action = msg.get("action")
-        if not action:
+        if not isinstance(msg, dict) or not msg.get("action"):
             return
+        # Commands run on the executor thread so VLC and LED calls never block the subscribe loop.
+        self.executor.submit(msg)
+
+    def handle_command(self, msg):
+        action = msg.get("action")
 
         if action == "play_direct":
             duration = msg.get("duration", 0)
@@ -25,20 +31,25 @@ class CommandListener(SubscribeCallback):
             if self.youtube_player.current_stream_url == stream_url:
                 self.youtube_player.seek(position)
                 self.player.seek(position)
-                self.youtube_player._player.play()
+                self.youtube_player.resume()
                 print(f"[CommandListener] Resumed stream at position {position}")
             else:
                 self.youtube_player.play_url(
                     url=stream_url,
                     position=position,
-                    volume=volume
+                    volume=volume,
+                    video_id=msg.get("video_id")
                 )
-                self.player.load_track(duration, video_id="(direct)")
+                self.player.load_track(duration, video_id=msg.get("video_id", "(direct)"))
                 self.player.seek(position)
                 self.player.play()
                 print(f"[CommandListener] Playing direct stream {stream_url} at position={position}, volume={volume}")
             return
 
+        elif action == "preload":
+            self.youtube_player.preload(msg.get("stream_url", ""), video_id=msg.get("video_id"))
+            print(f"[CommandListener] Preloading next track {msg.get('video_id')}")
+
         elif action == "pause":
             position = msg.get("position", None)
             if position is not None: